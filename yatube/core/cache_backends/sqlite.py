@@ -0,0 +1,268 @@
+"""Кэш в файле SQLite (WAL), общий для всех процессов на одном хосте.
+
+LocMemCache держит отдельную копию в каждом воркере gunicorn: попадания
+делятся на число воркеров, а инвалидация не доходит до соседей. Этот
+бэкенд хранит записи в одном файле базы в режиме WAL, поэтому читатели
+не блокируют писателя, а incr()/add() атомарны между процессами.
+
+Пример настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+                'MAX_SIZE': 256 * 1024 * 1024,
+            },
+        }
+    }
+
+При переполнении по числу записей (MAX_ENTRIES) или по объёму значений
+в байтах (MAX_SIZE) сначала удаляются просроченные записи, затем давно
+не читавшиеся (LRU).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE totals SET entries = entries + 1, size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE totals SET entries = entries - 1, size = size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE totals SET size = size - OLD.size + NEW.size;
+END;
+'''
+
+# Время последнего чтения обновляется не чаще раза в секунду, чтобы
+# горячие ключи не превращали каждое чтение в запись. Обновления копятся
+# в потоке и пишутся одной транзакцией раз в ACCESS_RESOLUTION секунд или
+# по ACCESS_BATCH ключей.
+ACCESS_RESOLUTION = 1.0
+ACCESS_BATCH = 500
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = os.path.abspath(location)
+        self._max_size = int(options.get('MAX_SIZE', 0)) or None
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение своё для каждого потока и каждого процесса после fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout,
+                isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # Иначе INSERT OR REPLACE не вызывает триггер удаления.
+            connection.execute('PRAGMA recursive_triggers=ON')
+            connection.executescript(SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _store(self, connection, key, value, timeout):
+        blob = self._dumps(value)
+        connection.execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+            (key, blob, self.get_backend_timeout(timeout), time.time(),
+             len(blob)))
+
+    def _live(self, connection, key, now):
+        return connection.execute(
+            'SELECT value, accessed FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, now)).fetchone()
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        names = {self._key(key, version): key for key in keys}
+        connection = self._connection()
+        now = time.time()
+        placeholders = ', '.join('?' * len(names))
+        try:
+            rows = connection.execute(
+                f'SELECT key, value, accessed FROM cache '
+                f'WHERE key IN ({placeholders}) '
+                f'AND (expires IS NULL OR expires > ?)',
+                (*names, now)).fetchall()
+        except sqlite3.OperationalError:
+            # База занята (database is locked): для кэша это промах.
+            return {}
+        self._touch(connection, [
+            key for key, _, accessed in rows
+            if accessed < now - ACCESS_RESOLUTION
+        ], now)
+        return {names[key]: pickle.loads(value) for key, value, _ in rows}
+
+    def _touch(self, connection, keys, now):
+        """Запоминает время чтения keys и изредка пишет накопленное."""
+        local = self._local
+        pending = local.__dict__.setdefault('accessed', {})
+        pending.update(dict.fromkeys(keys, now))
+        if not pending or (
+                len(pending) < ACCESS_BATCH
+                and now - getattr(local, 'flushed', 0) < ACCESS_RESOLUTION):
+            return
+        local.flushed = now
+        rows = [(accessed, key) for key, accessed in pending.items()]
+        pending.clear()
+        # Чтение не ждёт писателя: если база занята, время чтения
+        # теряется, а LRU становится чуть менее точным.
+        connection.execute('PRAGMA busy_timeout = 0')
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?', rows)
+            connection.execute('COMMIT')
+        except sqlite3.OperationalError:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+        finally:
+            connection.execute(
+                f'PRAGMA busy_timeout = {int(self._busy_timeout * 1000)}')
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._write() as connection:
+            for key, value in data.items():
+                self._store(
+                    connection, self._key(key, version), value, timeout)
+            self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            if self._live(connection, key, time.time()):
+                return False
+            self._store(connection, key, value, timeout)
+            self._cull(connection)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            row = self._live(connection, key, time.time())
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            blob = self._dumps(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (blob, len(blob), key))
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            return connection.execute(
+                'UPDATE cache SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._live(self._connection(), key, time.time()) is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        with self._write() as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys])
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def _cull(self, connection):
+        entries, size = connection.execute(
+            'SELECT entries, size FROM totals').fetchone()
+        if not self._over(entries, size):
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        entries, size = connection.execute(
+            'SELECT entries, size FROM totals').fetchone()
+        while self._over(entries, size) and entries:
+            # Как и встроенные бэкенды: удаляем 1/CULL_FREQUENCY записей,
+            # начиная с тех, что дольше всего не читались.
+            victims = (entries // self._cull_frequency
+                       if self._cull_frequency else entries) or 1
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (victims,))
+            entries, size = connection.execute(
+                'SELECT entries, size FROM totals').fetchone()
+
+    def _over(self, entries, size):
+        return (entries > self._max_entries
+                or (self._max_size is not None and size > self._max_size))
+
+    def close(self, **kwargs):
+        # Соединение переиспользуется между запросами, как у LocMemCache.
+        pass
@@ -0,0 +1,93 @@
+"""Чтение с реплик для GET и HEAD.
+
+ReplicaMiddleware на время запроса выбирает реплику из
+settings.DATABASE_REPLICAS, и ReplicaRouter отправляет на неё чтения.
+Запись всегда идёт в основную базу; после первой записи чтения до конца
+запроса тоже идут в основную. Ответ на запрос с записью ставит cookie
+settings.DATABASE_PRIMARY_COOKIE на DATABASE_PRIMARY_STICKY_SECONDS
+секунд: пока реплика догоняет, клиент читает из основной базы и видит
+свои изменения.
+
+Реплика может отставать, а версии кэша (posts.caching) увеличиваются
+сразу после коммита в основной базе. Чтобы отставшие данные не легли в
+кэш под актуальной версией, DATABASE_REPLICA_MAX_LAG секунд после
+изменения области запросы с реплики получают для неё временную версию.
+
+Реплика выбирается функцией из DATABASE_REPLICA_SELECTOR: 'random',
+'round_robin' или путь к функции (replicas, request) -> алиас.
+"""
+import itertools
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+_local = threading.local()
+_turn = itertools.count()
+
+
+def _random(replicas, request):
+    return random.choice(replicas)
+
+
+def _round_robin(replicas, request):
+    return replicas[next(_turn) % len(replicas)]
+
+
+SELECTORS = {'random': _random, 'round_robin': _round_robin}
+
+
+def select(request):
+    """Алиас реплики для запроса или None, если реплик нет."""
+    replicas = list(settings.DATABASE_REPLICAS)
+    if not replicas:
+        return None
+    name = settings.DATABASE_REPLICA_SELECTOR
+    selector = SELECTORS.get(name) or import_string(name)
+    return selector(replicas, request)
+
+
+def start(replica):
+    _local.replica = replica
+    _local.wrote = False
+
+
+def reading_replica():
+    """True, если чтения текущего запроса идут на реплику."""
+    return getattr(_local, 'replica', None) is not None
+
+
+def stop():
+    """Завершает запрос; True, если в нём была запись."""
+    wrote = getattr(_local, 'wrote', False)
+    _local.replica = None
+    _local.wrote = False
+    return wrote
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = getattr(_local, 'replica', None)
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Внутри транзакции читаем то же, что пишем.
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        _local.replica = None
+        _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит вместе с данными из основной базы.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
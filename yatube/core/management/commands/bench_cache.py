@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.core.management.commands.createcachetable import (
+    Command as CreateCacheTable,
+)
+from django.db import connection, connections
+
+from core.cache_backends.sqlite import SQLiteCache
+
+DB_TABLE = 'bench_cache_table'
+
+
+def build_caches(tmp):
+    params = {'OPTIONS': {'MAX_ENTRIES': 1000000}}
+    return {
+        'locmem': lambda: LocMemCache('bench', params),
+        'file': lambda: FileBasedCache(os.path.join(tmp, 'file'), params),
+        'db': lambda: DatabaseCache(DB_TABLE, params),
+        'sqlite': lambda: SQLiteCache(
+            os.path.join(tmp, 'cache.sqlite3'), params),
+    }
+
+
+def read_through(factory, keys, value, results):
+    """Воркер: читает ключи, при промахе кладёт значение в кэш."""
+    connections.close_all()
+    cache = factory()
+    misses = 0
+    for key in keys:
+        if cache.get(key) is None:
+            misses += 1
+            cache.set(key, value)
+    results.put(misses)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает LocMemCache, файловый, DB-кэш Django и '
+            'SQLiteCache: задержку операций и долю попаданий между '
+            'процессами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=2000)
+        parser.add_argument('--size', type=int, default=4096,
+                            help='Размер значения в байтах.')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--keys', type=int, default=200)
+
+    def handle(self, *args, **options):
+        tmp = tempfile.mkdtemp(prefix='bench-cache-')
+        create_table = CreateCacheTable()
+        create_table.verbosity = 0
+        create_table.create_table('default', DB_TABLE, False)
+        try:
+            caches = build_caches(tmp)
+            self.stdout.write(
+                f'{"backend":<8} {"set, мкс":>10} {"get, мкс":>10} '
+                f'{"промахи":>9} {"попадания":>10}')
+            for name, factory in caches.items():
+                set_us, get_us = self.latency(factory(), options)
+                misses, hit_rate = self.shared(factory, options)
+                self.stdout.write(
+                    f'{name:<8} {set_us:>10.1f} {get_us:>10.1f} '
+                    f'{misses:>9} {hit_rate:>9.1%}')
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'DROP TABLE %s' % connection.ops.quote_name(DB_TABLE))
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def latency(self, cache, options):
+        value = b'x' * options['size']
+        keys = [f'latency:{i}' for i in range(options['ops'])]
+        started = time.perf_counter()
+        for key in keys:
+            cache.set(key, value)
+        set_time = time.perf_counter() - started
+        started = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        get_time = time.perf_counter() - started
+        return (set_time / len(keys) * 1e6, get_time / len(keys) * 1e6)
+
+    def shared(self, factory, options):
+        """Все воркеры читают одни ключи: общий кэш промахивается 1 раз."""
+        keys = [f'shared:{i}' for i in range(options['keys'])]
+        value = b'x' * options['size']
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        connections.close_all()
+        workers = [
+            context.Process(target=read_through,
+                            args=(factory, keys, value, results))
+            for _ in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        misses = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        total = len(keys) * len(workers)
+        return misses, 1 - misses / total
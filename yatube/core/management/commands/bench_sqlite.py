@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.sqlite_profile import apply_pragmas
+
+SCHEMA = '''
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    pub_date REAL NOT NULL
+);
+CREATE INDEX post_pub_date ON post (pub_date);
+CREATE TABLE stats (author_id INTEGER PRIMARY KEY, posts INTEGER NOT NULL);
+'''
+AUTHORS = 100
+
+
+def connect(path, profile):
+    # Как у Django: таймаут sqlite3 по умолчанию, транзакции вручную.
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    if profile:
+        apply_pragmas(connection)
+    return connection
+
+
+def writer(path, profile, seconds, seed, results):
+    """Создание поста: прочитать счётчик автора, вставить, обновить."""
+    connection = connect(path, profile)
+    rng = random.Random(seed)
+    begin = 'BEGIN IMMEDIATE' if profile else 'BEGIN'
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        author_id = rng.randrange(AUTHORS)
+        try:
+            connection.execute(begin)
+            connection.execute(
+                'SELECT posts FROM stats WHERE author_id = ?', [author_id])
+            connection.execute(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)', [author_id, 'x' * 200, time.time()])
+            connection.execute(
+                'UPDATE stats SET posts = posts + 1 WHERE author_id = ?',
+                [author_id])
+            connection.execute('COMMIT')
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+    results.put(('write', done, errors))
+
+
+def reader(path, profile, seconds, seed, results):
+    """Страница ленты со случайным смещением."""
+    connection = connect(path, profile)
+    rng = random.Random(seed)
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            connection.execute(
+                'SELECT id, author_id, text FROM post '
+                'ORDER BY pub_date DESC LIMIT 10 OFFSET ?',
+                [rng.randrange(1000)]).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(('read', done, errors))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность читателей и писателей '
+            'SQLite без профиля и с профилем core.sqlite_profile. '
+            'Работает на временном файле базы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        tmp = tempfile.mkdtemp(prefix='bench-sqlite-')
+        try:
+            self.stdout.write(
+                f'{"профиль":<8} {"чтений/с":>10} {"записей/с":>10} '
+                f'{"ошибок чтения":>14} {"ошибок записи":>14}')
+            for profile in (False, True):
+                path = os.path.join(tmp, f'{profile}.sqlite3')
+                self.prepare(path, options['posts'])
+                totals = self.run(path, profile, options)
+                seconds = options['seconds']
+                self.stdout.write(
+                    f'{"да" if profile else "нет":<8} '
+                    f'{totals["read"][0] / seconds:>10.0f} '
+                    f'{totals["write"][0] / seconds:>10.0f} '
+                    f'{totals["read"][1]:>14} {totals["write"][1]:>14}')
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def prepare(self, path, posts):
+        connection = sqlite3.connect(path)
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.executemany(
+                'INSERT INTO stats VALUES (?, 0)',
+                [(i,) for i in range(AUTHORS)])
+            now = time.time()
+            connection.executemany(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)',
+                [(i % AUTHORS, 'x' * 200, now - i) for i in range(posts)])
+        connection.close()
+
+    def run(self, path, profile, options):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(target=target, args=(
+                path, profile, options['seconds'], seed, results))
+            for seed, target in enumerate(
+                [writer] * options['writers']
+                + [reader] * options['readers'])
+        ]
+        for worker in workers:
+            worker.start()
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        for _ in workers:
+            kind, done, errors = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+        for worker in workers:
+            worker.join()
+        return totals
@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в базу реплики, чтобы проверить '
+            'чтение с реплики локально. Повторный запуск «догоняет» '
+            'реплику.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='replica',
+                            help='Алиас реплики в DATABASES.')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections:
+            raise CommandError(f'Нет базы {alias!r} в DATABASES.')
+        source = connections[DEFAULT_DB_ALIAS].settings_dict
+        target = connections[alias].settings_dict
+        if not (source['ENGINE'] == target['ENGINE']
+                == 'django.db.backends.sqlite3'):
+            raise CommandError('Обе базы должны быть SQLite.')
+        # backup() делает согласованную копию даже во время записи.
+        src = sqlite3.connect(source['NAME'])
+        dst = sqlite3.connect(target['NAME'])
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'{source["NAME"]} скопирована в {target["NAME"]}'))
@@ -0,0 +1,109 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tasks
+
+# Сколько пустых опросов между проверками зависших и старых задач.
+MAINTENANCE_EVERY = 60
+
+
+def loop(stop, interval, burst):
+    """Забирает и выполняет задачи до stop; возвращает их число."""
+    worker = tasks.worker_id()
+    idle = done = 0
+    while not stop.is_set():
+        task = tasks.claim(worker)
+        if task is not None:
+            tasks.run(task)
+            done += 1
+            continue
+        if burst:
+            break
+        if idle % MAINTENANCE_EVERY == 0:
+            tasks.recover()
+            tasks.purge()
+        idle += 1
+        stop.wait(interval)
+    return done
+
+
+def work(stop, interval, burst):
+    """Процесс пула: цикл loop() со своими соединениями с БД."""
+    # Останавливает родитель через stop, Ctrl+C до воркеров не доходит.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    connections.close_all()
+    loop(stop, interval, burst)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Запускает пул процессов, выполняющих задачи из очереди '
+            'core.tasks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=settings.TASKS_WORKERS,
+                            help='Число процессов; 0 — в текущем процессе.')
+        parser.add_argument('--interval', type=float,
+                            default=settings.TASKS_POLL_INTERVAL,
+                            help='Пауза между опросами пустой очереди, с.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выполнить готовые задачи и выйти.')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать статистику задач и выйти.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+        tasks.recover()
+        if not options['workers']:
+            self.work_in_process(options['interval'], options['burst'])
+            return
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        connections.close_all()
+        processes = [
+            context.Process(target=work, args=(
+                stop, options['interval'], options['burst']))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        self.stdout.write(f'Воркеров: {len(processes)}')
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for process in processes:
+                process.join()
+        self.print_stats()
+
+    def work_in_process(self, interval, burst):
+        stop = threading.Event()
+        previous = signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        try:
+            done = loop(stop, interval, burst)
+        except KeyboardInterrupt:
+            return
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        self.stdout.write(f'Выполнено задач: {done}')
+
+    def print_stats(self):
+        self.stdout.write(
+            f'{"задача":<45} {"ждут":>6} {"идут":>6} {"готово":>7} '
+            f'{"ошибок":>7} {"сред., с":>9} {"макс., с":>9}')
+        for row in tasks.stats():
+            self.stdout.write(
+                f'{row["name"]:<45} {row["pending"]:>6} {row["running"]:>6} '
+                f'{row["done"]:>7} {row["failed"]:>7} '
+                f'{row["avg_duration"] or 0:>9.3f} '
+                f'{row["max_duration"] or 0:>9.3f}')
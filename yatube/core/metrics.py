@@ -0,0 +1,265 @@
+"""Гистограммы времени ответа, времени в БД, числа запросов к БД и
+времени рендеринга шаблонов по именам URL.
+
+Каждый процесс копит гистограммы в памяти и не чаще раза в
+settings.METRICS_FLUSH_INTERVAL секунд сбрасывает их в свой файл
+в settings.METRICS_DIR. Эндпоинт /metrics складывает файлы всех
+процессов, поэтому Prometheus видит сумму по воркерам независимо от
+того, какой воркер ответил.
+
+Имя файла — pid и случайная метка процесса, так что новый процесс с
+тем же pid не перезапишет счётчики умершего. Файлы завершившихся
+процессов collect() прибавляет к общему archive.json и удаляет: сумма
+не уменьшается, а каталог не растёт с каждым перезапуском воркеров.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Имя метрики: (описание, границы корзин).
+METRICS = {
+    'yatube_request_duration_seconds': (
+        'Время обработки запроса.', DURATION_BUCKETS),
+    'yatube_db_duration_seconds': (
+        'Время выполнения SQL-запросов за один запрос.', DURATION_BUCKETS),
+    'yatube_db_queries': (
+        'Число SQL-запросов за один запрос.', QUERY_BUCKETS),
+    'yatube_template_duration_seconds': (
+        'Время рендеринга шаблонов за один запрос.', DURATION_BUCKETS),
+}
+
+UNRESOLVED = '<unresolved>'
+
+
+class Registry:
+    """Гистограммы одного процесса: (метрика, view) -> [корзины.., sum]."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.token = uuid.uuid4().hex[:12]
+        self.series = {}
+        self.flushed = time.monotonic()
+
+    def observe(self, name, view, value):
+        buckets = METRICS[name][1]
+        with self.lock:
+            if self.pid != os.getpid():
+                # После fork процесс не должен повторно отдать
+                # наблюдения родителя.
+                self.reset()
+            series = self.series.get((name, view))
+            if series is None:
+                series = self.series[(name, view)] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            return {key: list(value) for key, value in self.series.items()}
+
+
+registry = Registry()
+_local = threading.local()
+
+
+ARCHIVE = 'archive.json'
+LOCK = '.lock'
+
+
+def _path(name):
+    return os.path.join(settings.METRICS_DIR, name)
+
+
+def _write(name, data):
+    path = _path(name)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as file:
+        json.dump(data, file)
+    os.replace(tmp, path)
+
+
+def _read(name):
+    try:
+        with open(_path(name)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def flush():
+    """Сбрасывает гистограммы процесса в его файл (атомарно)."""
+    data = [[name, view, series]
+            for (name, view), series in registry.snapshot().items()]
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    _write(f'{registry.pid}-{registry.token}.json', data)
+    registry.flushed = time.monotonic()
+
+
+def maybe_flush():
+    if (time.monotonic() - registry.flushed
+            >= settings.METRICS_FLUSH_INTERVAL):
+        flush()
+
+
+def _alive(filename):
+    try:
+        pid = int(filename.split('-', 1)[0])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _add(total, data):
+    for name, view, series in data:
+        if name not in METRICS:
+            continue
+        current = total.setdefault((name, view), [0] * len(series))
+        for i, value in enumerate(series):
+            current[i] += value
+
+
+def _archive(dead):
+    """Переносит файлы умерших процессов в archive.json."""
+    with open(_path(LOCK), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = _read(ARCHIVE) or {'series': [], 'merged': []}
+        # merged защищает от двойного учёта, если процесс упал между
+        # записью архива и удалением файлов.
+        merged = set(archive['merged'])
+        total = {}
+        _add(total, archive['series'])
+        for filename in dead:
+            data = _read(filename)
+            if filename not in merged and data is not None:
+                _add(total, data)
+                merged.add(filename)
+        existing = set(os.listdir(settings.METRICS_DIR))
+        _write(ARCHIVE, {
+            'series': [[name, view, series]
+                       for (name, view), series in total.items()],
+            'merged': sorted(merged & existing),
+        })
+        for filename in dead:
+            try:
+                os.remove(_path(filename))
+            except FileNotFoundError:
+                pass
+
+
+def collect():
+    """Сумма гистограмм всех процессов, включая несброшенные данные
+    текущего."""
+    flush()
+    files = [filename for filename in os.listdir(settings.METRICS_DIR)
+             if filename.endswith('.json') and filename != ARCHIVE]
+    dead = [filename for filename in files if not _alive(filename)]
+    if dead:
+        _archive(dead)
+    total = {}
+    archive = _read(ARCHIVE) or {'series': [], 'merged': []}
+    _add(total, archive['series'])
+    merged = set(archive['merged'])
+    for filename in files:
+        if filename in dead or filename in merged:
+            continue
+        data = _read(filename)
+        if data is not None:
+            _add(total, data)
+    return total
+
+
+def _label(value):
+    return (value.replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition(total):
+    """Текстовый формат Prometheus 0.0.4."""
+    lines = []
+    for name, (help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, view), series in sorted(total.items()):
+            if metric != name:
+                continue
+            label = f'view="{_label(view)}"'
+            for bound, count in zip(buckets, series):
+                lines.append(
+                    f'{name}_bucket{{{label},le="{_number(float(bound))}"}} '
+                    f'{count}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {series[-2]}')
+            lines.append(f'{name}_count{{{label}}} {series[-2]}')
+            lines.append(f'{name}_sum{{{label}}} {_number(series[-1])}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    """Замеры одного запроса; заполняются обёрткой SQL и бэкендом
+    шаблонов."""
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.rendering = False
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def stop():
+    _local.stats = None
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def db_wrapper(execute, sql, params, many, context):
+    stats = current()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+def record(view, duration, stats):
+    registry.observe('yatube_request_duration_seconds', view, duration)
+    registry.observe('yatube_db_duration_seconds', view, stats.db_time)
+    registry.observe('yatube_db_queries', view, stats.queries)
+    registry.observe(
+        'yatube_template_duration_seconds', view, stats.template_time)
@@ -0,0 +1,65 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import db_routers, metrics
+
+
+class MetricsMiddleware:
+    """Замеряет запрос и записывает его в гистограммы core.metrics.
+
+    Ставится первым в MIDDLEWARE, чтобы время ответа включало работу
+    остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        match = request.resolver_match
+        # Ответ из кэша страниц приходит без разбора URL.
+        view = (match.view_name if match
+                else getattr(request, 'metrics_view', metrics.UNRESOLVED))
+        metrics.record(view, time.perf_counter() - started, stats)
+        metrics.maybe_flush()
+        return response
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения GET и HEAD на реплику (см. core.db_routers).
+
+    Ставится перед SessionMiddleware, чтобы сохранение сессии тоже
+    считалось записью запроса.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replica = None
+        if (request.method in ('GET', 'HEAD')
+                and settings.DATABASE_PRIMARY_COOKIE not in request.COOKIES):
+            replica = db_routers.select(request)
+        db_routers.start(replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = db_routers.stop()
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.DATABASE_PRIMARY_COOKIE, '1',
+                max_age=settings.DATABASE_PRIMARY_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
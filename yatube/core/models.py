@@ -0,0 +1,53 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Фоновая задача в очереди core.tasks."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+    ACTIVE = (PENDING, RUNNING)
+
+    name = models.CharField('Функция', max_length=200)
+    payload = models.TextField('Аргументы (JSON)')
+    key = models.CharField('Ключ', max_length=200, blank=True, null=True,
+                           help_text='Активна не больше одной задачи '
+                                     'с этим ключом')
+    state = models.CharField('Состояние', max_length=10, choices=STATES,
+                             default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток')
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    started = models.DateTimeField('Начата', null=True, blank=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+    worker = models.CharField('Воркер', max_length=100, blank=True)
+    duration = models.FloatField('Время выполнения, с', null=True,
+                                 blank=True)
+    error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(state__in=('pending', 'running')),
+                name='task_active_key'),
+        ]
+        indexes = [
+            # Выборка воркера: WHERE state = ... AND run_at <= ...
+            models.Index(fields=['state', 'run_at'],
+                         name='task_state_run_at'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} [{self.state}]'
@@ -0,0 +1,54 @@
+"""Профиль производительности SQLite для боевой нагрузки.
+
+Включается settings.SQLITE_PERFORMANCE_PROFILE и применяется к каждому
+новому соединению SQLite по сигналу connection_created:
+
+* journal_mode=WAL — читатели не ждут писателя и наоборот;
+* synchronous=NORMAL — в WAL не теряет целостность, fsync только на
+  контрольных точках;
+* mmap_size, cache_size — чтение страниц из памяти, а не через read();
+* busy_timeout — ждать блокировку, а не сразу отдавать
+  «database is locked»;
+* temp_store=MEMORY — временные таблицы сортировок в памяти.
+
+Транзакции atomic() начинаются с BEGIN IMMEDIATE: блокировка на запись
+берётся сразу. С обычным BEGIN две транзакции, которые сначала читают,
+а потом пишут, не могут повысить блокировку друг после друга, и одна
+падает с «database is locked» без ожидания busy_timeout.
+
+Значения можно переопределить в settings.SQLITE_PRAGMAS.
+"""
+from django.conf import settings
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+
+def pragmas():
+    return {**PRAGMAS, **settings.SQLITE_PRAGMAS}
+
+
+def apply_pragmas(connection):
+    """Выполняет PRAGMA профиля на соединении sqlite3."""
+    for name, value in pragmas().items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+def _begin_immediate(connection):
+    connection.cursor().execute('BEGIN IMMEDIATE')
+
+
+def connection_created(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not (
+            settings.SQLITE_PERFORMANCE_PROFILE):
+        return
+    apply_pragmas(connection.connection)
+    # Django начинает транзакцию atomic() этим методом.
+    connection._start_transaction_under_autocommit = (
+        lambda: _begin_immediate(connection))
@@ -0,0 +1,143 @@
+"""Очередь фоновых задач в основной базе данных.
+
+enqueue() записывает вызов функции в таблицу Task, а воркеры
+manage.py run_workers забирают задачи и выполняют их вне запроса.
+Брокер — та же база, поэтому задача, поставленная внутри транзакции,
+видна воркерам только после её коммита и пропадает при откате.
+
+Задача захватывается условным UPDATE ... WHERE state = 'pending':
+из нескольких воркеров его выполнит ровно один. Упавшая задача
+повторяется через TASKS_RETRY_BACKOFF * 2 ** (попытка - 1) секунд, но не
+больше TASKS_MAX_ATTEMPTS раз. Пока задача с ключом key в очереди или
+выполняется, такая же не ставится. Задачи, зависшие в running дольше
+TASKS_LOCK_TIMEOUT (воркер умер), возвращаются в очередь.
+"""
+import json
+import logging
+import os
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Case, Count, F, Max, Q, Value, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CANDIDATES = 10
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, key=None, delay=0, max_attempts=None, **kwargs):
+    """Ставит func(*args, **kwargs) в очередь.
+
+    Аргументы должны сериализоваться в JSON. Задача с ключом key не
+    ставится, если такая уже ждёт или выполняется.
+    """
+    task = Task(
+        name=task_name(func),
+        payload=json.dumps({'args': args, 'kwargs': kwargs},
+                           cls=DjangoJSONEncoder),
+        key=key,
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    Task.objects.bulk_create([task], ignore_conflicts=key is not None)
+
+
+def worker_id():
+    return f'{os.uname().nodename}:{os.getpid()}'
+
+
+def claim(worker):
+    """Захватывает готовую к выполнению задачу или возвращает None."""
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        state=Task.PENDING, run_at__lte=now,
+    ).order_by('run_at', 'pk').values_list('pk', flat=True)
+    for pk in candidates[:CLAIM_CANDIDATES]:
+        claimed = Task.objects.filter(pk=pk, state=Task.PENDING).update(
+            state=Task.RUNNING, worker=worker, started=now,
+            attempts=F('attempts') + 1)
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def backoff(attempts):
+    return min(settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1),
+               settings.TASKS_RETRY_BACKOFF_MAX)
+
+
+def run(task):
+    """Выполняет захваченную задачу и записывает результат."""
+    started = time.perf_counter()
+    try:
+        payload = json.loads(task.payload)
+        import_string(task.name)(*payload['args'], **payload['kwargs'])
+    except Exception:
+        duration = time.perf_counter() - started
+        logger.exception('Task %s (%s) failed, attempt %s of %s',
+                         task.pk, task.name, task.attempts, task.max_attempts)
+        changes = {'error': traceback.format_exc(), 'duration': duration}
+        if task.attempts < task.max_attempts:
+            changes.update(state=Task.PENDING, run_at=timezone.now()
+                           + timedelta(seconds=backoff(task.attempts)))
+        else:
+            changes.update(state=Task.FAILED, finished=timezone.now())
+    else:
+        changes = {'state': Task.DONE, 'finished': timezone.now(),
+                   'duration': time.perf_counter() - started}
+    Task.objects.filter(pk=task.pk).update(**changes)
+    return changes['state']
+
+
+def recover():
+    """Возвращает в очередь задачи умерших воркеров."""
+    stale = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return Task.objects.filter(state=Task.RUNNING, started__lt=stale).update(
+        state=Case(
+            When(attempts__gte=F('max_attempts'), then=Value(Task.FAILED)),
+            default=Value(Task.PENDING),
+        ),
+        error='Воркер не завершил задачу за TASKS_LOCK_TIMEOUT.')
+
+
+def purge():
+    """Удаляет выполненные задачи старше TASKS_KEEP_DONE."""
+    old = timezone.now() - timedelta(seconds=settings.TASKS_KEEP_DONE)
+    return Task.objects.filter(state=Task.DONE, finished__lt=old).delete()[0]
+
+
+def run_pending(worker=None, limit=None):
+    """Выполняет готовые задачи, пока они есть; возвращает их число."""
+    worker = worker or worker_id()
+    done = 0
+    while limit is None or done < limit:
+        task = claim(worker)
+        if task is None:
+            break
+        run(task)
+        done += 1
+    return done
+
+
+def stats():
+    """Число задач по состояниям и время выполнения по функциям."""
+    by_state = {
+        state: Count('pk', filter=Q(state=state)) for state, _ in Task.STATES
+    }
+    finished = Q(state=Task.DONE)
+    return list(Task.objects.order_by('name').values('name').annotate(
+        **by_state,
+        avg_duration=Avg('duration', filter=finished),
+        max_duration=Max('duration', filter=finished),
+    ))
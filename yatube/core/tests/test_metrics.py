@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+User = get_user_model()
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+def observe_in_child(value):
+    metrics.registry.observe(
+        'yatube_request_duration_seconds', 'posts:index', value)
+    metrics.flush()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='auth')
+        Post.objects.create(author=user, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        metrics.registry.reset()
+
+    def scrape(self):
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def value(self, text, sample):
+        for line in text.splitlines():
+            if line.startswith(sample + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        self.fail(f'{sample} не найден в /metrics')
+
+    def test_records_view_metrics(self):
+        """Запрос попадает во все гистограммы под именем URL."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        expected_queries = len(queries)
+        text = self.scrape()
+        label = '{view="posts:index"}'
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertEqual(
+            self.value(text, f'yatube_request_duration_seconds_count{label}'),
+            1)
+        self.assertEqual(
+            self.value(text, f'yatube_db_queries_sum{label}'),
+            expected_queries)
+        self.assertGreater(
+            self.value(text, f'yatube_template_duration_seconds_sum{label}'),
+            0)
+        self.assertGreater(
+            self.value(text, f'yatube_db_duration_seconds_sum{label}'), 0)
+        self.assertEqual(self.value(
+            text, 'yatube_db_queries_bucket{view="posts:index",le="+Inf"}'),
+            1)
+
+    def test_unresolved_url(self):
+        """Запросы без имени URL собираются в одну серию."""
+        self.client.get('/no-such-page/')
+        text = self.scrape()
+        self.assertEqual(self.value(
+            text,
+            'yatube_request_duration_seconds_count{view="<unresolved>"}'),
+            1)
+
+    def test_aggregates_across_processes(self):
+        """Наблюдения из других процессов складываются с текущим."""
+        metrics.registry.observe(
+            'yatube_request_duration_seconds', 'posts:index', 0.5)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=observe_in_child, args=(0.01,))
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        total = metrics.collect()
+        series = total[('yatube_request_duration_seconds', 'posts:index')]
+        self.assertEqual(series[-2], 4)
+        self.assertAlmostEqual(series[-1], 0.53)
+        # Файлы завершившихся процессов слиты в архив, сумма та же.
+        self.assertEqual(
+            sorted(os.listdir(METRICS_DIR)),
+            sorted([metrics.ARCHIVE, metrics.LOCK,
+                    f'{os.getpid()}-{metrics.registry.token}.json']))
+        total = metrics.collect()
+        series = total[('yatube_request_duration_seconds', 'posts:index')]
+        self.assertEqual(series[-2], 4)
+
+    def test_reused_pid_keeps_old_counters(self):
+        """Процесс с тем же pid не перезаписывает файл предыдущего."""
+        metrics.registry.observe(
+            'yatube_request_duration_seconds', 'posts:index', 0.5)
+        metrics.flush()
+        metrics.registry.reset()
+        metrics.registry.observe(
+            'yatube_request_duration_seconds', 'posts:index', 0.5)
+        series = metrics.collect()[
+            ('yatube_request_duration_seconds', 'posts:index')]
+        self.assertEqual(series[-2], 2)
+
+    def test_requires_token(self):
+        """Без верного токена /metrics отвечает 404."""
+        for header in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(header=header):
+                response = self.client.get(
+                    '/metrics', REMOTE_ADDR='127.0.0.1', **header)
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_disabled_without_token(self):
+        """Без METRICS_TOKEN эндпоинт выключен."""
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer None')
+        self.assertEqual(response.status_code, 404)
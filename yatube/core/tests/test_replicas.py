@@ -0,0 +1,124 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import db_routers
+from posts import caching
+from posts.models import Post
+from posts.page_cache import HEADER
+
+User = get_user_model()
+
+INDEX = reverse('posts:index')
+
+
+def first_replica(replicas, request):
+    return replicas[0]
+
+
+class SelectTests(SimpleTestCase):
+    def test_no_replicas(self):
+        self.assertIsNone(db_routers.select(RequestFactory().get('/')))
+
+    @override_settings(DATABASE_REPLICAS=['a', 'b'],
+                       DATABASE_REPLICA_SELECTOR='round_robin')
+    def test_round_robin(self):
+        request = RequestFactory().get('/')
+        picked = {db_routers.select(request) for _ in range(4)}
+        self.assertEqual(picked, {'a', 'b'})
+
+    @override_settings(
+        DATABASE_REPLICAS=['a', 'b'],
+        DATABASE_REPLICA_SELECTOR='core.tests.test_replicas.first_replica')
+    def test_custom_selector(self):
+        self.assertEqual(db_routers.select(RequestFactory().get('/')), 'a')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    # Реплика в тестах — зеркало основной базы (TEST MIRROR).
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def queries(self, alias, method, *args, **kwargs):
+        with CaptureQueriesContext(connections[alias]) as context:
+            method(*args, **kwargs)
+        return len(context)
+
+    def test_get_reads_from_replica(self):
+        with CaptureQueriesContext(connections['default']) as primary:
+            self.assertGreater(
+                self.queries('replica', self.client.get, INDEX), 0)
+        self.assertEqual(len(primary), 0)
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент читает из основной базы."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertIn(settings.DATABASE_PRIMARY_COOKIE, response.cookies)
+        self.assertEqual(
+            self.queries('replica', self.client.get, INDEX), 0)
+
+    def test_reads_after_write_go_to_primary(self):
+        """В запросе с записью чтения после неё идут в основную базу."""
+        self.client.force_login(self.user)
+        author = User.objects.create_user(username='author')
+        self.client.cookies.pop(settings.DATABASE_PRIMARY_COOKIE, None)
+        url = reverse('posts:profile_follow', kwargs={'username': 'author'})
+        with CaptureQueriesContext(connections['replica']) as context:
+            response = self.client.get(url)
+        self.assertIn(settings.DATABASE_PRIMARY_COOKIE, response.cookies)
+        self.assertTrue(author.following.filter(user=self.user).exists())
+        self.assertFalse(any(
+            'INSERT' in query['sql'] for query in context.captured_queries))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_cookie_without_replicas(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertNotIn(settings.DATABASE_PRIMARY_COOKIE, response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_REPLICA_MAX_LAG=5)
+class ReplicaLagTests(TransactionTestCase):
+    """Отставшая реплика не заполняет кэш под актуальной версией."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def tearDown(self):
+        db_routers.stop()
+
+    def test_version_marked_after_change(self):
+        caching.bump(caching.INDEX)
+        clean = caching.version(caching.INDEX)
+        db_routers.start('replica')
+        self.assertNotEqual(caching.version(caching.INDEX), clean)
+        with mock.patch('posts.caching.time.time',
+                        return_value=caching.time.time() + 6):
+            self.assertEqual(caching.version(caching.INDEX), clean)
+        db_routers.stop()
+        self.assertEqual(caching.version(caching.INDEX), clean)
+
+    def test_page_rendered_during_lag_not_served_later(self):
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.client.get(INDEX)
+        self.assertNotEqual(self.client.get(INDEX).get(HEADER), 'hit')
+        with mock.patch('posts.caching.time.time',
+                        return_value=caching.time.time() + 6):
+            self.assertEqual(self.client.get(INDEX).get(HEADER), 'miss')
+            self.assertEqual(self.client.get(INDEX).get(HEADER), 'hit')
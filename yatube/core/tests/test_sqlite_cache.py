@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache_backends.sqlite import SQLiteCache
+
+INCREMENTS = 50
+WORKERS = 4
+
+
+def increment(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(INCREMENTS):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.location = os.path.join(self.dir, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        """get/set/add/delete/get_many ведут себя как у LocMemCache."""
+        cache = self.cache
+        self.assertIsNone(cache.get('missing'))
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertFalse(cache.add('key', 'other'))
+        self.assertTrue(cache.add('new', 'value'))
+        self.assertEqual(cache.get_many(['key', 'new', 'missing']),
+                         {'key': {'value': 1}, 'new': 'value'})
+        cache.delete('key')
+        self.assertFalse(cache.has_key('key'))
+        cache.clear()
+        self.assertIsNone(cache.get('new'))
+
+    def test_expired_entries_are_invisible(self):
+        """Просроченная запись не читается и может быть добавлена заново."""
+        self.cache.set('key', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+        self.assertFalse(self.cache.touch('missing'))
+        self.assertTrue(self.cache.touch('key', None))
+
+    def test_shared_between_instances(self):
+        """Запись одного экземпляра видна другому с тем же файлом."""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.make_cache().get('key'), 'value')
+
+    def test_incr_is_atomic_across_processes(self):
+        """incr() из нескольких процессов не теряет обновлений."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=increment, args=(self.location,))
+                   for _ in range(WORKERS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), INCREMENTS * WORKERS)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_entries_are_culled(self):
+        """При переполнении удаляются давно не читавшиеся записи."""
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=4)
+        for number in range(4):
+            cache.set(f'key{number}', number)
+        cache._connection().execute(
+            "UPDATE cache SET accessed = 0 WHERE key LIKE '%key0'")
+        cache.set('key4', 4)
+        self.assertIsNone(cache.get('key0'))
+        self.assertEqual(cache.get_many(['key1', 'key4']),
+                         {'key1': 1, 'key4': 4})
+
+    def test_read_while_database_is_locked(self):
+        """Занятая база не превращает чтение в ошибку или ожидание."""
+        cache = self.make_cache(BUSY_TIMEOUT=5)
+        cache.set('key', 'value')
+        cache._connection().execute('UPDATE cache SET accessed = 0')
+        writer = sqlite3.connect(self.location, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        started = time.monotonic()
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertLess(time.monotonic() - started, 1)
+        writer.execute('ROLLBACK')
+        writer.close()
+        locked = mock.Mock(**{'execute.side_effect': sqlite3.OperationalError(
+            'database is locked')})
+        with mock.patch.object(cache, '_connection', return_value=locked):
+            self.assertIsNone(cache.get('key'))
+
+    def test_access_times_written_in_batches(self):
+        """Время чтения пишется одной транзакцией, а не на каждый get()."""
+        for number in range(3):
+            self.cache.set(f'key{number}', number)
+        self.cache._connection().execute('UPDATE cache SET accessed = 0')
+        self.cache.get('key0')
+        self.cache._local.flushed = time.time()
+        self.cache.get('key1')
+        self.cache.get('key2')
+        stale, = self.cache._connection().execute(
+            'SELECT COUNT(*) FROM cache WHERE accessed = 0').fetchone()
+        self.assertEqual(stale, 2)
+        self.cache._local.flushed = 0
+        self.cache.get('key0')
+        stale, = self.cache._connection().execute(
+            'SELECT COUNT(*) FROM cache WHERE accessed = 0').fetchone()
+        self.assertEqual(stale, 0)
+
+    def test_size_limit(self):
+        """Суммарный объём значений не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for number in range(20):
+            cache.set(f'key{number}', b'x' * 1000)
+        size, = cache._connection().execute(
+            'SELECT SUM(size) FROM cache').fetchone()
+        self.assertLessEqual(size, 10000)
+        self.assertEqual(cache.get('key19'), b'x' * 1000)
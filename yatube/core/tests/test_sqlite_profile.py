@@ -0,0 +1,68 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, override_settings
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def setUp(self):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            self.skipTest('Профиль только для SQLite.')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.path = os.path.join(self.tmp, 'db.sqlite3')
+
+    def connect(self):
+        """Отдельное соединение Django с файлом во временном каталоге."""
+        default = connections[DEFAULT_DB_ALIAS]
+        settings_dict = {**default.settings_dict, 'NAME': self.path}
+        wrapper = type(default)(settings_dict, alias='profile')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PERFORMANCE_PROFILE=True,
+                       SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_applied(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+
+    def test_profile_off_by_default(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+
+    def writer_blocked(self, wrapper):
+        """Может ли другой писатель начать транзакцию, пока открыта
+        транзакция atomic() соединения wrapper."""
+        wrapper.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True)
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        try:
+            other.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            return True
+        else:
+            other.execute('ROLLBACK')
+            return False
+        finally:
+            other.close()
+            wrapper.rollback()
+            wrapper.set_autocommit(True)
+
+    @override_settings(SQLITE_PERFORMANCE_PROFILE=True)
+    def test_transactions_begin_immediate(self):
+        self.assertTrue(self.writer_blocked(self.connect()))
+
+    def test_transactions_deferred_without_profile(self):
+        self.assertFalse(self.writer_blocked(self.connect()))
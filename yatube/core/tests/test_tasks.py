@@ -0,0 +1,138 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+User = get_user_model()
+
+CALLS = []
+
+
+def record(value, suffix=''):
+    CALLS.append(value + suffix)
+
+
+def fail():
+    raise ValueError('ошибка')
+
+
+@override_settings(TASKS_MAX_ATTEMPTS=3, TASKS_RETRY_BACKOFF=10)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_and_run(self):
+        tasks.enqueue(record, 'a', suffix='!')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(CALLS, ['a!'])
+        task = Task.objects.get()
+        self.assertEqual(task.state, Task.DONE)
+        self.assertEqual(task.attempts, 1)
+        self.assertIsNotNone(task.duration)
+
+    def test_key_deduplicates_active_tasks(self):
+        tasks.enqueue(record, 'a', key='same')
+        tasks.enqueue(record, 'b', key='same')
+        self.assertEqual(Task.objects.count(), 1)
+        tasks.run_pending()
+        # После выполнения ключ свободен.
+        tasks.enqueue(record, 'c', key='same')
+        tasks.run_pending()
+        self.assertEqual(CALLS, ['a', 'c'])
+
+    def test_delay(self):
+        tasks.enqueue(record, 'a', delay=60)
+        self.assertEqual(tasks.run_pending(), 0)
+
+    def test_retry_with_backoff_then_fail(self):
+        tasks.enqueue(fail)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        task = Task.objects.get()
+        self.assertEqual(task.state, Task.PENDING)
+        self.assertIn('ValueError', task.error)
+        self.assertGreater(task.run_at, timezone.now() + timedelta(seconds=9))
+        self.assertEqual(tasks.run_pending(), 0)
+        for _ in range(2):
+            Task.objects.update(run_at=timezone.now())
+            with self.assertLogs('core.tasks', 'ERROR'):
+                tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.attempts, 3)
+        self.assertEqual(task.state, Task.FAILED)
+        self.assertEqual(tasks.backoff(2), 20)
+
+    def test_claimed_task_not_claimed_again(self):
+        tasks.enqueue(record, 'a')
+        self.assertIsNotNone(tasks.claim('first'))
+        self.assertIsNone(tasks.claim('second'))
+
+    @override_settings(TASKS_LOCK_TIMEOUT=60)
+    def test_recover_stale_task(self):
+        tasks.enqueue(record, 'a')
+        tasks.claim('dead')
+        Task.objects.update(started=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(tasks.recover(), 1)
+        tasks.run_pending()
+        self.assertEqual(CALLS, ['a'])
+
+    def test_stats(self):
+        tasks.enqueue(record, 'a')
+        tasks.enqueue(fail, max_attempts=1)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        tasks.enqueue(record, 'b', delay=60)
+        rows = {row['name']: row for row in tasks.stats()}
+        self.assertEqual(rows['core.tests.test_tasks.record']['done'], 1)
+        self.assertEqual(rows['core.tests.test_tasks.record']['pending'], 1)
+        self.assertEqual(rows['core.tests.test_tasks.fail']['failed'], 1)
+        output = StringIO()
+        call_command('run_workers', stats=True, stdout=output)
+        self.assertIn('core.tests.test_tasks.fail', output.getvalue())
+
+    def test_command_runs_in_process(self):
+        tasks.enqueue(record, 'a')
+        call_command('run_workers', workers=0, burst=True, stdout=StringIO())
+        self.assertEqual(CALLS, ['a'])
+
+    def test_in_process_worker_polls(self):
+        """Без --burst воркер в текущем процессе ждёт новые задачи."""
+        tasks.enqueue(record, 'a')
+        polls = []
+
+        def wait(event, timeout):
+            polls.append(timeout)
+            if len(polls) == 2:
+                event.set()
+
+        with mock.patch('threading.Event.wait', wait):
+            call_command('run_workers', workers=0, interval=5,
+                         stdout=StringIO())
+        self.assertEqual(CALLS, ['a'])
+        self.assertEqual(polls, [5, 5])
+
+    def test_password_reset_email_queued(self):
+        User.objects.create_user(
+            username='auth', email='auth@example.com', password='pass')
+        response = self.client.post(
+            '/auth/password_reset/', {'email': 'auth@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        # Ссылка с токеном не хранится в очереди.
+        payload = Task.objects.get().payload
+        self.assertNotIn('auth@example.com', payload)
+        self.assertNotIn('token', json.loads(payload)['args'][1])
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['auth@example.com'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
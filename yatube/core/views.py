@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as metrics_registry
+
 
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию;
@@ -9,3 +15,17 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    # Метрики раскрывают внутренности сайта: отдаём их только сборщику
+    # с токеном. Адрес клиента не проверяем: за обратным прокси на том
+    # же хосте все запросы приходят с 127.0.0.1.
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(
+            header.encode(), f'Bearer {token}'.encode()):
+        raise Http404
+    return HttpResponse(
+        metrics_registry.exposition(metrics_registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
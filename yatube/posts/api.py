@@ -0,0 +1,121 @@
+"""JSON API только для чтения: ленты, комментарии и выгрузка постов.
+
+Строки берутся через values(), без создания объектов моделей. Ленты
+листаются курсором (CursorPaginator), выгрузка отдаётся потоком по
+.iterator() и не держит в памяти больше одной пачки строк.
+"""
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from .models import Comment, Group, Post, User
+from .paginators import CURSOR_PARAM, CursorPaginator
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 2000
+
+POST_FIELDS = ('pk', 'text', 'pub_date', 'author__username', 'group__slug',
+               'image')
+COMMENT_FIELDS = ('pk', 'post_id', 'author__username', 'text', 'created')
+
+
+def post_row(row):
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': default_storage.url(row['image']) if row['image'] else None,
+    }
+
+
+def comment_row(row):
+    return {
+        'id': row['pk'],
+        'post': row['post_id'],
+        'author': row['author__username'],
+        'text': row['text'],
+        'created': row['created'],
+    }
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        size = PAGE_SIZE
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def _page(request, queryset, fields, serialize, ordering, key='results'):
+    paginator = CursorPaginator(
+        queryset.values(*fields), _page_size(request), ordering)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return JsonResponse({
+        key: [serialize(row) for row in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+def _posts(request, queryset):
+    return _page(request, queryset, POST_FIELDS, post_row,
+                 ('-pub_date', '-pk'))
+
+
+def index(request):
+    return _posts(request, Post.objects.all())
+
+
+def group_posts(request, slug):
+    group_id = get_object_or_404(
+        Group.objects.values_list('pk', flat=True), slug=slug)
+    return _posts(request, Post.objects.filter(group_id=group_id))
+
+
+def profile(request, username):
+    author_id = get_object_or_404(
+        User.objects.values_list('pk', flat=True), username=username)
+    return _posts(request, Post.objects.filter(author_id=author_id))
+
+
+def comments(request, post_id, key='results'):
+    """Комментарии поста; key — имя списка в ответе.
+
+    Фрагмент posts:comments?format=json отдаёт их под прежним ключом
+    'comments'.
+    """
+    get_object_or_404(Post.objects.values_list('pk', flat=True), pk=post_id)
+    return _page(request, Comment.objects.filter(post_id=post_id),
+                 COMMENT_FIELDS, comment_row, ('-created', '-pk'), key)
+
+
+def _stream(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + encoder.encode(post_row(row))
+        separator = ','
+    yield ']'
+
+
+def export(request):
+    """Все посты массивом JSON по возрастанию id.
+
+    Параметр ``after`` продолжает прерванную выгрузку с поста, id
+    которого больше указанного.
+    """
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        after = 0
+    rows = (Post.objects.filter(pk__gt=after).order_by('pk')
+            .values(*POST_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    response = StreamingHttpResponse(
+        _stream(rows), content_type='application/json')
+    response['Content-Disposition'] = 'attachment; filename="posts.json"'
+    return response
@@ -0,0 +1,122 @@
+"""Версии для ключей фрагментного кэша.
+
+Каждая область (лента, группа, профиль, пост) хранит в кэше номер
+версии, который входит в ключ {% cache %}. Сигналы моделей увеличивают
+версию при изменении данных, поэтому фрагменты можно хранить часами:
+устаревший фрагмент просто перестаёт запрашиваться.
+
+Внутри транзакции bump() повторяется после коммита: запрос, успевший
+прочитать старые строки под уже увеличенной версией, сохранит их под
+ключом, который после коммита больше не запросят.
+
+Запрос, читающий с реплики (core.db_routers), может не видеть записи,
+уже увеличившей версию. Поэтому DATABASE_REPLICA_MAX_LAG секунд после
+bump() версия для такого запроса получает метку текущей секунды:
+отставшие данные сохраняются под ключами, которые после этого окна не
+запрашиваются, а чистую версию заполняет уже догнавшая реплика.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import db_routers
+
+INDEX = 'index'
+GROUPS = 'groups'
+TRENDING = 'trending'
+KEY_PREFIX = 'posts:version:'
+CHANGED_PREFIX = 'posts:changed:'
+
+
+def group(group_id):
+    return f'group:{group_id}'
+
+
+def profile(author_id):
+    return f'profile:{author_id}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(instance):
+    """Области страницы поста: сам пост, профиль автора (число его
+    постов в боковой колонке) и группа (её название)."""
+    scopes = [post(instance.pk), profile(instance.author_id)]
+    if instance.group_id is not None:
+        scopes.append(group(instance.group_id))
+    return tuple(scopes)
+
+
+def feed(user_id):
+    return f'feed:{user_id}'
+
+
+def following(user_id):
+    return f'following:{user_id}'
+
+
+def followers(author_id):
+    return f'followers:{author_id}'
+
+
+def _initial():
+    # Вытесненная версия начинается заново с большего числа, чтобы
+    # не совпасть со старыми фрагментами, которые ещё лежат в кэше.
+    return int(time.time() * 1000)
+
+
+def version(*scopes):
+    """Возвращает общую версию нескольких областей одной строкой."""
+    keys = [KEY_PREFIX + scope for scope in scopes]
+    lagging = db_routers.reading_replica()
+    changed_keys = [CHANGED_PREFIX + scope
+                    for scope in scopes] if lagging else []
+    versions = cache.get_many(keys + changed_keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial(), None)
+            versions[key] = cache.get(key)
+    result = '.'.join(str(versions[key]) for key in keys)
+    now = time.time()
+    if any(versions.get(key, 0) > now - settings.DATABASE_REPLICA_MAX_LAG
+           for key in changed_keys):
+        result += f'~{int(now)}'
+    return result
+
+
+def bump(*scopes):
+    """Инвалидирует все фрагменты указанных областей."""
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = KEY_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+    now = time.time()
+    cache.set_many({CHANGED_PREFIX + scope: now for scope in scopes}, None)
+
+
+def changed(*scopes):
+    """Время (unix) последнего bump() любой из областей.
+
+    Если кэш потерял время всех областей, им становится текущее: раньше
+    него изменения уже не видны.
+    """
+    keys = [CHANGED_PREFIX + scope for scope in scopes]
+    times = cache.get_many(keys)
+    if not times:
+        now = time.time()
+        for key in keys:
+            cache.add(key, now, None)
+        times = cache.get_many(keys)
+    return max(times.values(), default=None)
@@ -0,0 +1,98 @@
+"""Условные GET-запросы (ETag / Last-Modified) для лент и страницы поста.
+
+Валидаторы считаются до основных запросов страницы:
+
+* ETag — хэш версий областей фрагментного кэша (см. caching), которые
+  сигналы увеличивают при любом изменении данных страницы, плюс
+  пользователь и строка запроса;
+* Last-Modified — время последнего bump() тех же областей: его
+  сдвигает любая запись, в том числе правки и удаления, поэтому
+  отдельные запросы MAX(pub_date) и MAX(created) не нужны.
+
+Совпадение отдаёт 304 без рендеринга шаблона. Cache-Control: no-cache
+заставляет браузер каждый раз переспрашивать, а не угадывать свежесть
+по Last-Modified.
+"""
+import hashlib
+from calendar import timegm
+from datetime import datetime
+from functools import wraps
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import caching, follow_graph
+from .models import Group, Post, User
+
+
+def _etag(request, scopes, *extra):
+    user = request.user.pk if request.user.is_authenticated else ''
+    raw = '|'.join(map(str, (
+        caching.version(*scopes), user, request.GET.urlencode(), *extra)))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _last_modified(scopes):
+    changed = caching.changed(*scopes)
+    if changed is None:
+        return None
+    return datetime.fromtimestamp(changed, timezone.utc)
+
+
+def index(request):
+    scopes = (caching.INDEX,)
+    return _etag(request, scopes), _last_modified(scopes)
+
+
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    scopes = (caching.group(group_id),)
+    return _etag(request, scopes, group_id), _last_modified(scopes)
+
+
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    scopes = (caching.profile(author_id), caching.GROUPS)
+    following = (request.user.is_authenticated and author_id is not None
+                 and follow_graph.is_following(request.user.pk, author_id))
+    return (_etag(request, scopes, author_id, following),
+            _last_modified(scopes))
+
+
+def post_detail(request, post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'group_id').first()
+    scopes = caching.post_scopes(post) if post else (caching.post(post_id),)
+    return _etag(request, scopes), _last_modified(scopes)
+
+
+def conditional(validators):
+    """Отвечает 304, если валидаторы совпали с заголовками запроса."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag, modified = validators(request, *args, **kwargs)
+            etag = quote_etag(etag)
+            last_modified = (timegm(modified.utctimetuple())
+                             if modified is not None else None)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                return response
+            response.setdefault('ETag', etag)
+            if last_modified is not None:
+                response.setdefault('Last-Modified', http_date(last_modified))
+            patch_cache_control(response, no_cache=True)
+            if request.user.is_authenticated:
+                # private=False попало бы в заголовок как есть.
+                patch_cache_control(response, private=True)
+            return response
+        return wrapper
+    return decorator
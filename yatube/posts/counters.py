@@ -0,0 +1,91 @@
+"""Денормализованные счётчики автора в AuthorStats."""
+from django.db.models import (Count, F, IntegerField, OuterRef, Q,
+                              Subquery)
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Post
+
+FIELDS = ('posts', 'followers')
+BATCH_SIZE = 500
+
+
+def change(author_id, field, delta):
+    """Сдвигает счётчик автора; строка создаётся при первом изменении."""
+    expression = {field: F(field) + delta}
+    if delta < 0:
+        AuthorStats.objects.filter(
+            pk=author_id, **{f'{field}__gte': -delta}).update(**expression)
+    elif not AuthorStats.objects.filter(pk=author_id).update(**expression):
+        AuthorStats.objects.get_or_create(author_id=author_id)
+        AuthorStats.objects.filter(pk=author_id).update(**expression)
+
+
+def get(author_id, field):
+    return AuthorStats.objects.filter(pk=author_id).values_list(
+        field, flat=True).first() or 0
+
+
+def posts_count(author):
+    """Число постов автора; с select_related('stats') — без запроса."""
+    try:
+        return author.stats.posts
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def actual():
+    """Настоящие значения счётчиков: {author_id: {поле: значение}}."""
+    values = {}
+    for field, model, key in (('posts', Post, 'author'),
+                              ('followers', Follow, 'author')):
+        rows = model.objects.order_by().values(key).annotate(
+            total=Count('pk'))
+        for row in rows:
+            values.setdefault(row[key], dict.fromkeys(FIELDS, 0))
+            values[row[key]][field] = row['total']
+    return values
+
+
+def mismatches():
+    """Список (author_id, поле, сохранено, на самом деле)."""
+    expected = actual()
+    stored = {
+        row['author']: row
+        for row in AuthorStats.objects.values('author', *FIELDS)
+    }
+    result = []
+    for author_id in sorted(expected.keys() | stored.keys()):
+        for field in FIELDS:
+            have = stored.get(author_id, {}).get(field, 0)
+            want = expected.get(author_id, {}).get(field, 0)
+            if have != want:
+                result.append((author_id, field, have, want))
+    return result
+
+
+def _count(model):
+    """Число строк model у автора текущей строки AuthorStats."""
+    rows = model.objects.filter(author=OuterRef('pk')).order_by().values(
+        'author').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def rebuild():
+    """Пересчитывает все счётчики по таблицам Post и Follow.
+
+    Счётчики считает один UPDATE с подзапросами: список id всех авторов
+    в IN (...) упёрся бы в лимит переменных SQLite.
+    """
+    missing = set()
+    for model in (Post, Follow):
+        missing.update(model.objects.filter(
+            author__stats__isnull=True,
+        ).order_by().values_list('author_id', flat=True).distinct())
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(author_id=author_id) for author_id in missing],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    AuthorStats.objects.update(posts=_count(Post), followers=_count(Follow))
+    return AuthorStats.objects.filter(
+        Q(posts__gt=0) | Q(followers__gt=0)).count()
@@ -0,0 +1,60 @@
+"""Граф подписок в кэше.
+
+Для каждого пользователя хранятся два отсортированных массива id
+(array('I'), 4 байта на подписку): на кого он подписан и кто подписан
+на него. Массив загружается из Follow при первом обращении и кладётся в
+общий кэш под ключом с версией области caching.following(user_id) или
+caching.followers(author_id). Сигналы Follow увеличивают версии обеих
+областей, поэтому устаревший массив просто перестаёт читаться.
+
+Проверка подписки — бинарный поиск, без SQL при попадании в кэш.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import caching
+from .models import Follow
+
+KEY_PREFIX = 'posts:follow-graph:'
+TYPECODE = 'I'
+
+
+def _load(scope, other, **lookup):
+    key = f'{KEY_PREFIX}{scope}:{caching.version(scope)}'
+    data = cache.get(key)
+    ids = array(TYPECODE)
+    if data is not None:
+        ids.frombytes(data)
+        return ids
+    ids.extend(Follow.objects.filter(**lookup).order_by(other).values_list(
+        other, flat=True))
+    cache.set(key, ids.tobytes(), settings.POSTS_FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def following(user_id):
+    """Отсортированные id авторов, на которых подписан пользователь."""
+    return _load(caching.following(user_id), 'author_id', user_id=user_id)
+
+
+def followers(author_id):
+    """Отсортированные id подписчиков автора."""
+    return _load(caching.followers(author_id), 'user_id',
+                 author_id=author_id)
+
+
+def contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def is_following(user_id, author_id):
+    return contains(following(user_id), author_id)
+
+
+def changed(user_id, author_id):
+    """Вызывается сигналами при подписке и отписке."""
+    caching.bump(caching.following(user_id), caching.followers(author_id))
@@ -0,0 +1,48 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.template.loader import get_template
+
+# Прежний вариант: ссылка на каждую страницу.
+FULL_RANGE = Template(
+    '{% for i in page_obj.paginator.page_range %}'
+    '{% if page_obj.number == i %}'
+    '<li class="page-item active"><span class="page-link">{{ i }}</span></li>'
+    '{% else %}'
+    '<li class="page-item"><a class="page-link" href="?page={{ i }}">'
+    '{{ i }}</a></li>'
+    '{% endif %}{% endfor %}')
+
+
+class Command(BaseCommand):
+    help = ('Замеряет рендеринг пагинатора: ссылки на все страницы против '
+            'окна вокруг текущей. База не используется.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--per-page', type=int, default=10)
+        parser.add_argument('--page', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # range считается через len(), без запросов к базе.
+        paginator = Paginator(range(options['posts']), options['per_page'])
+        page_obj = paginator.get_page(options['page'])
+        window = get_template('posts/includes/paginator.html')
+        self.stdout.write(
+            f'Страниц: {paginator.num_pages}, текущая: {page_obj.number}')
+        for title, render in (
+                ('Все страницы', lambda: FULL_RANGE.render(
+                    Context({'page_obj': page_obj}))),
+                ('Окно', lambda: window.render({'page_obj': page_obj}))):
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                html = render()
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f'{title}: {statistics.median(timings) * 1000:.1f} мс, '
+                f'{len(html.encode()) / 1024:.1f} КБ')
@@ -0,0 +1,94 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import counters, search
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+def vocabulary(size):
+    return [f'слово{i}' for i in range(size)]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет построение поискового индекса и задержку запросов '
+            'на синтетических постах. Данные создаются в транзакции, '
+            'которая затем откатывается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--words', type=int, default=20,
+                            help='Слов в посте.')
+        parser.add_argument('--vocabulary', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--backend', choices=('fts5', 'python'))
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['backend'] == 'fts5' and not search.fts5_available():
+            raise CommandError('Таблица FTS5 недоступна в этой базе.')
+        backend = (
+            search.FTS5Backend() if options['backend'] == 'fts5'
+            else search.PythonBackend() if options['backend']
+            else search.get_backend())
+        try:
+            with transaction.atomic():
+                self.run(backend, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, backend, options):
+        rng = random.Random(options['seed'])
+        words = vocabulary(options['vocabulary'])
+        # Частоты слов по закону Ципфа, как в живом тексте.
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, len(words) + 1)))
+        author = User.objects.create(username='bench-search')
+        started = time.perf_counter()
+        batch = []
+        for _ in range(options['posts']):
+            text = ' '.join(rng.choices(
+                words, cum_weights=weights, k=options['words']))
+            batch.append(Post(text=text, author=author))
+            if len(batch) >= 10000:
+                Post.objects.bulk_create(batch)
+                batch = []
+        Post.objects.bulk_create(batch)
+        counters.rebuild()
+        self.stdout.write(
+            f'Постов: {options["posts"]}, '
+            f'загрузка {time.perf_counter() - started:.1f} с')
+
+        started = time.perf_counter()
+        backend.rebuild()
+        self.stdout.write(
+            f'Индекс {backend.name}: {time.perf_counter() - started:.1f} с')
+
+        # Запросы из редких, средних и частых слов, по одному и парами.
+        bands = (words[:10], words[10:1000], words[1000:])
+        latencies = []
+        for i in range(options['queries']):
+            terms = [rng.choice(bands[i % 3])]
+            if i % 2:
+                terms.append(rng.choice(bands[(i + 1) % 3]))
+            started = time.perf_counter()
+            backend.search(terms, None, 11)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'Запросов: {len(latencies)}, '
+            f'p50 {statistics.median(latencies):.1f} мс, '
+            f'p95 {p95:.1f} мс, max {latencies[-1]:.1f} мс')
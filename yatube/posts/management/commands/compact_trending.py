@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает популярные посты по свежим комментариям. '
+            'Запускается периодически, например из cron.')
+
+    def handle(self, *args, **options):
+        state = trending.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов с оценкой: {len(state["scores"])}'))
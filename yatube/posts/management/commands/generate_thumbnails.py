@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для всех картинок постов, которых ещё нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.POSTS_THUMBNAIL_WORKERS,
+            help='Число процессов; 0 — в текущем процессе.')
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True).distinct().iterator()
+        started = time.monotonic()
+        if options['workers']:
+            connections.close_all()
+            with thumbnails.make_pool(options['workers']) as pool:
+                done = sum(1 for _ in pool.map(
+                    thumbnails.generate, names, chunksize=16))
+        else:
+            done = sum(1 for _ in map(thumbnails.generate, names))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done} '
+            f'за {time.monotonic() - started:.1f} с'))
@@ -0,0 +1,294 @@
+"""Массовый импорт постов, комментариев и подписок из JSON Lines или CSV.
+
+Файл читается потоком и пишется через bulk_create пачками по
+--chunk-size строк, каждая в своей транзакции. Авторы и группы
+ищутся через словари в памяти, которые дополняются одним запросом на
+пачку. Счётчики, ленты, поисковый индекс и кэш пересобираются один раз
+в конце (bulk.after_load).
+
+Поля строк:
+
+* posts: author, text, group (slug), pub_date (ISO 8601), image (имя
+  файла в хранилище), id — если задан, сохраняется, и на него можно
+  ссылаться из комментариев;
+* comments: post (id), author, text, created;
+* follows: user, author.
+"""
+import csv
+import itertools
+import json
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+MAX_REPORTED_ERRORS = 20
+# В JSON значения могут быть любого типа; остальной код ждёт строки и
+# целые id.
+STRING_FIELDS = ('author', 'user', 'text', 'group', 'pub_date', 'created',
+                 'image')
+ID_FIELDS = ('id', 'post')
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(file, file_format):
+    """Пары (номер строки файла, словарь или None)."""
+    if file_format == 'csv':
+        # Поле в кавычках может занимать несколько строк файла, поэтому
+        # номер берётся у reader, а не считается по записям.
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if line:
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты, комментарии или подписки из JSON Lines '
+            'или CSV пачками bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=('posts', 'comments', 'follows'))
+        parser.add_argument('path', help='Файл или - для stdin.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Строк в одном INSERT; по умолчанию — предел СУБД.')
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы.')
+        parser.add_argument('--skip-derived', action='store_true')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.users = {}
+        self.groups = {}
+        self.explicit_ids = False
+        self.errors = 0
+        file_format = options['format'] or (
+            'csv' if options['path'].endswith('.csv') else 'jsonl')
+        if options['path'] == '-':
+            self.load(sys.stdin, file_format)
+        else:
+            try:
+                file = open(options['path'], newline='', encoding='utf-8')
+            except OSError as error:
+                raise CommandError(error)
+            with file:
+                self.load(file, file_format)
+        if self.explicit_ids:
+            # Иначе на PostgreSQL следующий пост получит занятый id.
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                        no_style(), [Post]):
+                    cursor.execute(sql)
+        bulk.after_load(self.stdout, rebuild=not options['skip_derived'])
+
+    def load(self, file, file_format):
+        kind = self.options['kind']
+        model, build = {
+            'posts': (Post, self.post),
+            'comments': (Comment, self.comment),
+            'follows': (Follow, self.follow),
+        }[kind]
+        rows = read_rows(file, file_format)
+        size = self.options['chunk_size']
+        started = time.perf_counter()
+        total = 0
+        with bulk.explicit_dates(Post._meta.get_field('pub_date'),
+                                 Comment._meta.get_field('created')):
+            while True:
+                chunk = list(itertools.islice(rows, size))
+                if not chunk:
+                    break
+                objects = self.build(chunk, build)
+                with transaction.atomic():
+                    model.objects.bulk_create(
+                        objects, batch_size=self.options['batch_size'],
+                        ignore_conflicts=kind == 'follows')
+                total += len(objects)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'Строк: {total}, {total / elapsed:.0f} в секунду')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f} строк в секунду), '
+            f'ошибок: {self.errors}'))
+
+    def build(self, chunk, build):
+        rows = [(number, row) for number, row in chunk
+                if self.parsed(number, row)]
+        self.resolve(rows)
+        objects = []
+        for number, row in rows:
+            try:
+                objects.append(build(row))
+            except RowError as error:
+                self.error(number, error)
+        return objects
+
+    def parsed(self, number, row):
+        if not isinstance(row, dict):
+            self.error(number, 'строка не разобрана')
+            return False
+        for field in STRING_FIELDS:
+            value = row.get(field)
+            if value is not None and not isinstance(value, str):
+                self.error(number, f'поле {field} должно быть строкой')
+                return False
+        for field in ID_FIELDS:
+            value = row.get(field)
+            if value is not None and (isinstance(value, bool)
+                                      or not isinstance(value, (int, str))):
+                self.error(number, f'поле {field} должно быть целым числом')
+                return False
+        return True
+
+    def error(self, number, message):
+        self.errors += 1
+        if self.errors <= MAX_REPORTED_ERRORS:
+            self.stderr.write(f'Строка {number}: {message}')
+
+    def resolve(self, rows):
+        """Дополняет словари авторов и групп и находит id постов
+        пачки, которые уже есть в базе."""
+        kind = self.options['kind']
+        id_field = {'posts': 'id', 'comments': 'post'}.get(kind)
+        ids = set()
+        for _, row in rows:
+            try:
+                ids.add(int(row.get(id_field)))
+            except (TypeError, ValueError):
+                pass
+        self.existing_posts = set(Post.objects.filter(
+            pk__in=ids).values_list('pk', flat=True)) if ids else set()
+        usernames = {
+            row.get(field) for _, row in rows
+            for field in ('author', 'user') if row.get(field)
+        } - self.users.keys()
+        slugs = {row['group'] for _, row in rows
+                 if row.get('group')} - self.groups.keys()
+        self.users.update(User.objects.filter(
+            username__in=usernames).values_list('username', 'pk'))
+        self.groups.update(Group.objects.filter(
+            slug__in=slugs).values_list('slug', 'pk'))
+        if not self.options['create_missing']:
+            return
+        missing = usernames - self.users.keys()
+        if missing:
+            password = make_password(None)
+            User.objects.bulk_create(
+                [User(username=name, password=password) for name in missing],
+                ignore_conflicts=True)
+            self.users.update(User.objects.filter(
+                username__in=missing).values_list('username', 'pk'))
+        missing = slugs - self.groups.keys()
+        if missing:
+            Group.objects.bulk_create(
+                [Group(slug=slug, title=slug, description='')
+                 for slug in missing],
+                ignore_conflicts=True)
+            self.groups.update(Group.objects.filter(
+                slug__in=missing).values_list('slug', 'pk'))
+
+    def user_id(self, row, field):
+        try:
+            return self.users[row.get(field)]
+        except KeyError:
+            raise RowError(f'неизвестный пользователь {row.get(field)!r}')
+
+    def date(self, row, field):
+        value = row.get(field)
+        if not value:
+            return None
+        try:
+            date = parse_datetime(value)
+        except ValueError:
+            # Формат верный, но значение вне диапазона (месяц 13).
+            date = None
+        if date is None:
+            raise RowError(f'неверная дата {value!r}')
+        return date
+
+    def text(self, row):
+        text = (row.get('text') or '').strip()
+        if not text:
+            raise RowError('пустой текст')
+        return text
+
+    def post(self, row):
+        group_id = None
+        if row.get('group'):
+            try:
+                group_id = self.groups[row['group']]
+            except KeyError:
+                raise RowError(f'неизвестная группа {row["group"]!r}')
+        post_id = None
+        if row.get('id'):
+            try:
+                post_id = int(row['id'])
+            except ValueError:
+                raise RowError(f'неверный id {row["id"]!r}')
+            if post_id in self.existing_posts:
+                raise RowError(f'пост {post_id} уже есть')
+        post = Post(
+            id=post_id,
+            author_id=self.user_id(row, 'author'),
+            group_id=group_id,
+            text=self.text(row),
+            image=row.get('image') or '',
+        )
+        # Пустая дата — как при обычном создании поста.
+        post.pub_date = self.date(row, 'pub_date') or timezone.now()
+        if post_id is not None:
+            # id занимает только принятая строка; повтор внутри пачки
+            # тоже отбрасываем.
+            self.existing_posts.add(post_id)
+            self.explicit_ids = True
+        return post
+
+    def comment(self, row):
+        try:
+            post_id = int(row.get('post'))
+        except (TypeError, ValueError):
+            raise RowError(f'неверный пост {row.get("post")!r}')
+        if post_id not in self.existing_posts:
+            raise RowError(f'нет поста {post_id}')
+        comment = Comment(
+            post_id=post_id,
+            author_id=self.user_id(row, 'author'),
+            text=self.text(row),
+        )
+        comment.created = self.date(row, 'created') or timezone.now()
+        return comment
+
+    def follow(self, row):
+        user_id = self.user_id(row, 'user')
+        author_id = self.user_id(row, 'author')
+        if user_id == author_id:
+            raise RowError('подписка на себя')
+        return Follow(user_id=user_id, author_id=author_id)
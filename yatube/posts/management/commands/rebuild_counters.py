@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает или проверяет счётчики постов и подписчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только проверить счётчики, ничего не меняя.')
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            authors = counters.rebuild()
+            self.stdout.write(f'Пересчитано авторов: {authors}')
+        mismatches = counters.mismatches()
+        for author_id, field, stored, actual in mismatches:
+            self.stderr.write(
+                f'Автор {author_id}: {field} = {stored}, ожидалось {actual}')
+        if mismatches:
+            raise CommandError(f'Расхождений: {len(mismatches)}')
+        self.stdout.write(self.style.SUCCESS('Счётчики верны'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает поисковый индекс постов. Нужна после '
+            'массовой загрузки в обход сигналов (bulk_create, loaddata).')
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Индекс {backend.name} перестроен'))
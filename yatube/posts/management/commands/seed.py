@@ -0,0 +1,213 @@
+"""Синтетические данные для нагрузочного тестирования.
+
+Объекты создаются через bulk_create пачками внутри транзакций по
+--chunk-size строк, сигналы не срабатывают, поэтому в конце
+пересчитываются счётчики, поисковый индекс и ленты подписок
+(--skip-derived, чтобы пропустить). При одном и том же --seed
+получаются одни и те же данные.
+
+Популярность распределена по степенному закону: ранг r выбирается
+как floor(n ** u) - 1 для равномерного u, то есть P(r) ~ 1 / r. Первые
+пользователи — самые читаемые и самые пишущие авторы, свежие посты
+чаще комментируют.
+"""
+import io
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SENTENCES = 2000
+IMAGES = 16
+GROUP_SHARE = 0.7
+
+
+def skewed(rng, n):
+    """Ранг от 0 до n - 1 с вероятностью ~ 1 / (ранг + 1)."""
+    return min(int(n ** rng.random()), n) - 1
+
+
+class Command(BaseCommand):
+    help = ('Создаёт пользователей, группы, посты, комментарии и подписки '
+            'в заданных объёмах для нагрузочного тестирования.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--images', type=float, default=0,
+            help='Доля постов с картинкой, от 0 до 1.')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до сейчас распределить даты.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--password', help='Пароль пользователей; по умолчанию '
+            'войти под ними нельзя.')
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Строк в одном INSERT; по умолчанию — предел СУБД.')
+        parser.add_argument('--chunk-size', type=int, default=100000)
+        parser.add_argument('--skip-derived', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and (options['posts'] or options['follows']
+                                     or options['comments']):
+            raise CommandError('Для постов и подписок нужны пользователи.')
+        if options['posts'] < 1 and options['comments']:
+            raise CommandError('Для комментариев нужны посты.')
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        self.sentences = [
+            fake.sentence(nb_words=10) for _ in range(SENTENCES)]
+        self.prefix = f'seed{options["seed"]}-'
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Данные с --seed {options["seed"]} уже загружены.')
+        self.now = timezone.now()
+
+        users = self.stage('Пользователи', User, self.users(), 'users')
+        groups = self.stage('Группы', Group, self.groups(fake), 'groups')
+        images = self.images() if options['images'] > 0 else []
+        with bulk.explicit_dates(Post._meta.get_field('pub_date'),
+                                 Comment._meta.get_field('created')):
+            posts = self.stage('Посты', Post,
+                               self.posts(users, groups, images), 'posts')
+            self.stage('Комментарии', Comment,
+                       self.comments(users, posts), 'comments')
+        self.stage('Подписки', Follow, self.follows(users), 'follows',
+                   ignore_conflicts=True)
+        bulk.after_load(self.stdout, rebuild=not options['skip_derived'])
+
+    def stage(self, title, model, objects, option, ignore_conflicts=False):
+        """Загружает объекты и возвращает диапазон их id."""
+        total = self.options[option]
+        started = time.perf_counter()
+        last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        objects = iter(objects)
+        while True:
+            chunk = list(itertools.islice(objects, self.options['chunk_size']))
+            if not chunk:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    chunk, batch_size=self.options['batch_size'],
+                    ignore_conflicts=ignore_conflicts)
+        ids = model.objects.filter(pk__gt=last).aggregate(
+            first=Min('pk'), last=Max('pk'), count=Count('pk'))
+        self.stdout.write(
+            f'{title}: {ids["count"]} из {total} '
+            f'за {time.perf_counter() - started:.1f} с')
+        if ignore_conflicts:
+            # На такие строки никто не ссылается, пропуски в id не важны.
+            return None
+        if ids['count'] and ids['last'] - ids['first'] + 1 != ids['count']:
+            raise CommandError(
+                f'{title}: в id есть пропуски, запускайте seed без '
+                f'параллельной записи в базу.')
+        return ids['first'], ids['count']
+
+    def pick(self, ids, skew=True):
+        first, count = ids
+        if skew:
+            return first + skewed(self.rng, count)
+        return first + self.rng.randrange(count)
+
+    def date(self, index, total):
+        """Даты растут вместе с id, как у настоящих записей."""
+        span = timedelta(days=self.options['days'])
+        return self.now - span + span * (index + self.rng.random()) / total
+
+    def after_post(self, index, total):
+        """Дата комментария к посту с номером index из total.
+
+        date() кладёт пост в index-ю долю периода, поэтому комментарий
+        из её конца до сейчас не может оказаться старше поста.
+        """
+        span = timedelta(days=self.options['days'])
+        start = self.now - span + span * (index + 1) / total
+        return start + (self.now - start) * self.rng.random()
+
+    def text(self):
+        return ' '.join(self.rng.choices(
+            self.sentences, k=self.rng.randint(1, 5)))
+
+    def users(self):
+        password = make_password(self.options['password'])
+        now = self.now
+        for i in range(self.options['users']):
+            yield User(username=f'{self.prefix}{i}', password=password,
+                       date_joined=now)
+
+    def groups(self, fake):
+        for i in range(self.options['groups']):
+            yield Group(
+                title=fake.sentence(nb_words=3).rstrip('.'),
+                slug=f'{self.prefix}{i}',
+                description=self.text(),
+            )
+
+    def images(self):
+        names = []
+        for i in range(IMAGES):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            content = io.BytesIO()
+            Image.new('RGB', (960, 540), color).save(content, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/{self.prefix}{i}.jpg',
+                ContentFile(content.getvalue())))
+        return names
+
+    def posts(self, users, groups, images):
+        total = self.options['posts']
+        for i in range(total):
+            group_id = None
+            if groups[1] and self.rng.random() < GROUP_SHARE:
+                group_id = self.pick(groups)
+            image = ''
+            if images and self.rng.random() < self.options['images']:
+                image = self.rng.choice(images)
+            yield Post(text=self.text(), author_id=self.pick(users),
+                       group_id=group_id, image=image,
+                       pub_date=self.date(i, total))
+
+    def comments(self, users, posts):
+        total = self.options['comments']
+        first, count = posts
+        for i in range(total):
+            # Чем свежее пост, тем больше у него комментариев.
+            index = count - 1 - skewed(self.rng, count)
+            yield Comment(post_id=first + index,
+                          author_id=self.pick(users, False),
+                          text=self.rng.choice(self.sentences),
+                          created=self.after_post(index, count))
+
+    def follows(self, users):
+        # Дубликаты отбрасывает ignore_conflicts, поэтому подписок может
+        # оказаться чуть меньше запрошенного.
+        for _ in range(self.options['follows']):
+            user_id = self.pick(users, False)
+            author_id = self.pick(users)
+            if user_id != author_id:
+                yield Follow(user_id=user_id, author_id=author_id)
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:02
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_posts(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post = apps.get_model('posts', 'Post')
+    rows = Post.objects.order_by().values('author').annotate(total=Count('pk'))
+    for row in rows.iterator():
+        stats, _ = AuthorStats.objects.get_or_create(author_id=row['author'])
+        stats.posts = row['total']
+        stats.save(update_fields=['posts'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='posts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Посты'),
+        ),
+        migrations.RunPython(fill_posts, migrations.RunPython.noop),
+    ]
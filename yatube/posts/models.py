@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -20,12 +20,13 @@ class Post(models.Model):
                             help_text='Введите текст поста')
     pub_date = models.DateTimeField(auto_now_add=True, db_index=True,
                                     verbose_name='Дата публикации')
+    # Вместо индексов внешних ключей — составные индексы в Meta.
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='posts',
-                               verbose_name='Автор')
+                               verbose_name='Автор', db_index=False)
     group = models.ForeignKey(Group, blank=True, null=True,
                               on_delete=models.SET_NULL,
-                              related_name='posts',
+                              related_name='posts', db_index=False,
                               verbose_name='Имя группы',
                               help_text='Группа, к которой относится пост')
     image = models.ImageField(
@@ -37,15 +38,27 @@ class Post(models.Model):
     def __str__(self):
         return self.text[:SYMBOL]
 
+    def save(self, *args, **kwargs):
+        # Сигнал post_save обновляет счётчики автора в той же транзакции.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            # Профиль и группа: WHERE author/group = ... ORDER BY pub_date.
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date'),
+        ]
 
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
-                             related_name='comments')
+                             related_name='comments', db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='comments')
     text = models.TextField(verbose_name='Текст комментария',
@@ -54,16 +67,25 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            # Страницы комментариев поста по ключу (created, id).
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created'),
+            # Свежие комментарии для пересчёта популярных постов.
+            models.Index(fields=['created'], name='comment_created'),
+        ]
 
     def __str__(self):
         return self.text[:SYMBOL]
 
 
 class Follow(models.Model):
+    # Поиск по user покрывает ограничение user_author, по author —
+    # индекс follow_author_user.
     user = models.ForeignKey(User, on_delete=models.CASCADE,
-                             related_name='follower')
+                             related_name='follower', db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, unique=False,
-                               related_name='following')
+                               related_name='following', db_index=False)
 
     class Meta:
         constraints = [
@@ -71,6 +93,62 @@ class Follow(models.Model):
                 fields=['user', 'author'],
                 name='user_author')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user'),
+        ]
 
     def __str__(self):
         return f'Пользователь:{self.user} подписался на {self.author}'
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+    author = models.OneToOneField(User, on_delete=models.CASCADE,
+                                  primary_key=True, related_name='stats')
+    followers = models.PositiveIntegerField('Подписчики', default=0)
+    posts = models.PositiveIntegerField('Посты', default=0)
+
+    def __str__(self):
+        return (f'{self.author}: подписчиков {self.followers}, '
+                f'постов {self.posts}')
+
+
+class Timeline(models.Model):
+    """Готовая лента подписок: запись на каждый пост для каждого читателя."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_user_post')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date'],
+                         name='timeline_user_pub_date'),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.post}'
+
+
+class SearchTerm(models.Model):
+    """Инвертированный индекс поиска для СУБД без FTS5."""
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='search_terms')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'post'], name='searchterm_term_post'),
+        ]
+
+    def __str__(self):
+        return f'{self.term}: {self.post_id}'
@@ -0,0 +1,86 @@
+"""Кэш целых страниц для анонимных читателей.
+
+PageCacheMiddleware отвечает на GET и HEAD без cookie готовым ответом
+из кэша ещё до сессий, аутентификации и разбора URL. Кэшируются только
+страницы, view которых вызвал tag(): он помечает ответ областями
+caching (лента, группа, профиль, пост) и запоминает их версии. Сигналы
+моделей увеличивают версии при сохранении постов, комментариев и групп,
+и сохранённая страница перестаёт отдаваться, как только изменилась
+любая из её областей.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import caching
+
+KEY_PREFIX = 'posts:page:'
+HEADER = 'X-Page-Cache'
+
+
+def tag(request, *scopes):
+    """Разрешает кэшировать страницу и связывает её с областями."""
+    # Версия берётся до чтения данных: запись во время рендеринга
+    # сделает сохранённую страницу устаревшей, а не наоборот. Страница,
+    # прочитанная до коммита чужой записи, устареет от повторного
+    # bump() после коммита (см. caching).
+    request.page_cache_tags = (scopes, caching.version(*scopes))
+
+
+def _key(request):
+    url = request.build_absolute_uri()
+    return KEY_PREFIX + hashlib.md5(url.encode()).hexdigest()
+
+
+def _cacheable(request):
+    return (settings.PAGE_CACHE_ENABLED
+            and request.method in ('GET', 'HEAD')
+            and not request.COOKIES)
+
+
+def _storable(request, response):
+    return (getattr(request, 'page_cache_tags', None) is not None
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and 'private' not in response.get('Cache-Control', ''))
+
+
+def _serve(request, response):
+    response[HEADER] = 'hit'
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(
+            response.get('Last-Modified', '')),
+        response=response,
+    )
+
+
+class PageCacheMiddleware:
+    """Ставится сразу после MetricsMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _cacheable(request):
+            return self.get_response(request)
+        key = _key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            scopes, version, view_name, response = entry
+            if caching.version(*scopes) == version:
+                request.metrics_view = view_name
+                return _serve(request, response)
+        response = self.get_response(request)
+        if _storable(request, response):
+            scopes, version = request.page_cache_tags
+            view_name = request.resolver_match.view_name
+            response[HEADER] = 'miss'
+            cache.set(key, (scopes, version, view_name, response),
+                      settings.PAGE_CACHE_TIMEOUT)
+        return response
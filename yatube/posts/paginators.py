@@ -0,0 +1,302 @@
+import hashlib
+import json
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import (EmptyPage, InvalidPage, Page, Paginator,
+                                   PageNotAnInteger)
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import caching
+
+CURSOR_PARAM = 'cursor'
+COUNT_KEY_PREFIX = 'posts:count:'
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def dump_cursor(values):
+    """Непрозрачный курсор из JSON-совместимых значений."""
+    payload = json.dumps(list(values), separators=(',', ':'))
+    return urlsafe_base64_encode(force_bytes(payload))
+
+
+def load_cursor(cursor):
+    """Список значений курсора или None, если курсор испорчен."""
+    try:
+        values = json.loads(urlsafe_base64_decode(cursor).decode())
+    except (TypeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class CursorPage(Page):
+    """Страница ленты, полученная по курсору, без COUNT и OFFSET."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, cursor=None,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor or ''
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page %r>' % self.cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    # У курсорной страницы нет номеров: соседние открываются по
+    # next_cursor и previous_cursor.
+    def next_page_number(self):
+        raise InvalidPage('У курсорной страницы нет номера, '
+                          'используйте next_cursor.')
+
+    def previous_page_number(self):
+        raise InvalidPage('У курсорной страницы нет номера, '
+                          'используйте previous_cursor.')
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (keyset) вместо COUNT(*) + OFFSET.
+
+    Позиция страницы хранится в непрозрачном курсоре со значениями
+    полей ordering у крайней записи, поэтому стоимость запроса не зависит
+    от того, насколько далеко пролистана лента.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-pk')):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = tuple(ordering)
+
+    def _fields(self):
+        opts = self.object_list.model._meta
+        for name in self.ordering:
+            attr = name.lstrip('-')
+            field = opts.pk if attr == 'pk' else opts.get_field(attr)
+            yield attr, field, name.startswith('-')
+
+    def encode_cursor(self, obj, direction):
+        if isinstance(obj, dict):
+            # Строка из values(): поля ordering должны быть среди ключей.
+            obj = SimpleNamespace(**{
+                field.attname: obj[attr] for attr, field, _ in self._fields()
+            })
+        values = [
+            field.value_to_string(obj) for _, field, _ in self._fields()
+        ]
+        return dump_cursor([direction] + values)
+
+    def decode_cursor(self, cursor):
+        """Возвращает (направление, значения) или None для битого курсора."""
+        payload = load_cursor(cursor)
+        try:
+            direction, *raw = payload
+            fields = list(self._fields())
+            if direction not in (FORWARD, BACKWARD) or len(raw) != len(fields):
+                return None
+            values = [
+                field.to_python(value)
+                for (_, field, _), value in zip(fields, raw)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            return None
+        return direction, values
+
+    def _seek(self, values, backward):
+        # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)
+        condition = Q()
+        equal = Q()
+        for (attr, _, desc), value in zip(self._fields(), values):
+            lookup = 'lt' if desc != backward else 'gt'
+            condition |= equal & Q(**{f'{attr}__{lookup}': value})
+            equal &= Q(**{attr: value})
+        return condition
+
+    def get_page(self, cursor):
+        """Возвращает страницу по курсору; при ошибке — первую страницу."""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            direction, queryset = FORWARD, self.object_list
+        else:
+            direction, values = decoded
+            queryset = self.object_list.filter(
+                self._seek(values, direction == BACKWARD))
+        if direction == BACKWARD:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, decoded is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], FORWARD)
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], BACKWARD)
+        return CursorPage(rows, self, cursor, next_cursor, previous_cursor)
+
+
+def elided_page_range(number, num_pages, on_each_side=3, on_ends=2,
+                      show_last=True):
+    """Номера страниц: края и окрестность текущей, None — пропуск.
+
+    Как Paginator.get_elided_page_range из Django 3.2. Без show_last
+    правый край не выводится (число страниц известно лишь примерно).
+    """
+    if num_pages <= (on_each_side + on_ends) * 2:
+        return list(range(1, num_pages + 1))
+    if number > 1 + on_each_side + on_ends + 1:
+        pages = [*range(1, on_ends + 1), None,
+                 *range(number - on_each_side, number + 1)]
+    else:
+        pages = list(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        pages += [*range(number + 1, number + on_each_side + 1), None]
+        if show_last:
+            pages += range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        pages += range(number + 1, num_pages + 1)
+    return pages
+
+
+def estimate_count(model):
+    """Число строк таблицы по статистике СУБД или None, если её нет."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [table])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 появляется после первого ANALYZE.
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    count = int(str(row[0]).split()[0]) if row[0] is not None else -1
+    return count if count >= 0 else None
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) на каждый запрос.
+
+    Число объектов хранится в кэше под ключом из SQL подсчёта и версий
+    областей ``scopes`` (см. caching): сигналы, которые увеличивают версию
+    при записи, заодно инвалидируют и число. Без scopes число не кэшируется.
+
+    При settings.POSTS_APPROXIMATE_COUNT для выборки без фильтров по
+    таблице больше POSTS_APPROXIMATE_COUNT_THRESHOLD строк берётся
+    оценка из статистики СУБД; тогда ``approximate`` истинно. Номер
+    страницы при этом не сверяется с оценкой: страница за концом выборки
+    пуста и даёт 404, а страница за оценкой открывается, если в ней есть
+    посты.
+    """
+
+    def __init__(self, object_list, per_page, scopes=(), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.scopes = tuple(scopes)
+        self.approximate = False
+
+    def _key(self):
+        sql, params = self.object_list.order_by().query.sql_with_params()
+        raw = f'{sql}|{params!r}|{caching.version(*self.scopes)}'
+        return COUNT_KEY_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+    def _estimate(self):
+        if (not settings.POSTS_APPROXIMATE_COUNT
+                or self.object_list.query.where):
+            return None
+        count = estimate_count(self.object_list.model)
+        if count is None or count < settings.POSTS_APPROXIMATE_COUNT_THRESHOLD:
+            return None
+        return count
+
+    @cached_property
+    def count(self):
+        if not self.scopes:
+            return Paginator.count.func(self)
+        key = self._key()
+        cached = cache.get(key)
+        if cached is None:
+            count = self._estimate()
+            cached = (count is not None, count)
+            if count is None:
+                cached = (False, Paginator.count.func(self))
+            cache.set(key, cached, settings.POSTS_FRAGMENT_CACHE_TIMEOUT)
+        self.approximate, count = cached
+        return count
+
+    def validate_number(self, number):
+        if not self.count or not self.approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым.')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1.')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page])
+        if not object_list and number > 1:
+            raise EmptyPage('На странице нет постов.')
+        return self._get_page(object_list, number, self)
+
+    def get_page(self, number):
+        """Как Paginator.get_page, но пустая страница при оценке — 404.
+
+        Последняя страница по оценке может быть пустой, поэтому вместо
+        неё отдаётся 404.
+        """
+        if not self.count or not self.approximate:
+            return super().get_page(number)
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            raise Http404('На странице нет постов.')
+
+
+def get_page(request, queryset, per_page, scopes=()):
+    """Страница ленты в режиме settings.POSTS_PAGINATION.
+
+    Запрос с параметром ``cursor`` всегда обслуживается по курсору,
+    чтобы ссылки из курсорного режима оставались рабочими. ``scopes`` —
+    области caching, при изменении которых меняется число постов.
+    """
+    if (settings.POSTS_PAGINATION == 'cursor'
+            or CURSOR_PARAM in request.GET):
+        paginator = CursorPaginator(queryset, per_page)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
+    paginator = CachedCountPaginator(queryset, per_page, scopes)
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,179 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite используется виртуальная таблица FTS5 с ранжированием bm25.
+На остальных СУБД — инвертированный индекс SearchTerm, который строится
+токенизатором на Python и ранжируется по tf-idf. Оба индекса обновляются
+сигналами Post; после массовой загрузки нужна команда
+rebuild_search_index.
+"""
+import functools
+import math
+import re
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+
+from .models import AuthorStats, Post, SearchTerm
+from .paginators import CursorPage, dump_cursor, load_cursor
+
+FTS_TABLE = 'posts_post_fts'
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+TOKEN_RE = re.compile(r'\w+')
+
+FTS_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"text, tokenize='unicode61 remove_diacritics 2')"
+)
+
+
+def tokenize(text):
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if len(token) <= MAX_TERM_LENGTH
+    ]
+
+
+def fts5_available(using=connection):
+    """Есть ли таблица FTS5; ответ запоминается для каждой базы.
+
+    get_backend() зовётся на каждое сохранение поста и каждый поиск, а
+    таблица появляется только миграцией.
+    """
+    if using.vendor != 'sqlite':
+        return False
+    return _fts5_table_exists(using.alias, using.settings_dict['NAME'])
+
+
+@functools.lru_cache(maxsize=None)
+def _fts5_table_exists(alias, name):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+class FTS5Backend:
+    """Поиск через SQLite FTS5; чем меньше bm25, тем выше результат."""
+
+    name = 'fts5'
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}')
+
+    def search(self, terms, after, limit):
+        """Список (ранг, id поста) по возрастанию ранга."""
+        match = ' '.join(f'"{term}"' for term in terms)
+        sql = (f'SELECT rank, rowid FROM ('
+               f'SELECT rank, rowid FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s)')
+        params = [match]
+        if after is not None:
+            sql += ' WHERE rank > %s OR (rank = %s AND rowid > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+class PythonBackend:
+    """Поиск по таблице SearchTerm; ранг — минус сумма tf-idf."""
+
+    name = 'python'
+
+    def _terms(self, post):
+        weights = {}
+        for term in tokenize(post.text):
+            weights[term] = weights.get(term, 0) + 1
+        return [
+            SearchTerm(term=term, post_id=post.pk, weight=min(weight, 32767))
+            for term, weight in weights.items()
+        ]
+
+    def index(self, post):
+        SearchTerm.objects.filter(post_id=post.pk).delete()
+        SearchTerm.objects.bulk_create(self._terms(post))
+
+    def remove(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def rebuild(self):
+        SearchTerm.objects.all().delete()
+        batch = []
+        for post in Post.objects.only('pk', 'text').order_by().iterator():
+            batch.extend(self._terms(post))
+            if len(batch) >= settings.POSTS_SEARCH_BATCH_SIZE:
+                SearchTerm.objects.bulk_create(batch)
+                batch = []
+        SearchTerm.objects.bulk_create(batch)
+
+    def search(self, terms, after, limit):
+        postings = SearchTerm.objects.filter(term__in=terms).order_by()
+        frequency = dict(postings.values('term').annotate(
+            total=Count('pk')).values_list('term', 'total'))
+        if len(frequency) < len(terms):
+            return []
+        documents = AuthorStats.objects.aggregate(
+            total=Sum('posts'))['total'] or 1
+        rank = -Sum(Case(
+            *[When(term=term,
+                   then=F('weight') * Value(
+                       math.log(1 + documents / frequency[term])))
+              for term in terms],
+            output_field=FloatField(),
+        ))
+        rows = postings.values('post_id').annotate(
+            matched=Count('pk'), rank=rank,
+        ).filter(matched=len(terms))
+        if after is not None:
+            rows = rows.filter(
+                Q(rank__gt=after[0]) | Q(rank=after[0], post_id__gt=after[1]))
+        rows = rows.order_by('rank', 'post_id').values_list(
+            'rank', 'post_id')
+        return list(rows[:limit])
+
+
+def get_backend():
+    name = settings.POSTS_SEARCH_BACKEND
+    if name is None:
+        name = 'fts5' if fts5_available() else 'python'
+    return FTS5Backend() if name == 'fts5' else PythonBackend()
+
+
+def search_page(query, cursor, per_page):
+    """Страница результатов поиска по запросу, от лучших к худшим."""
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    after = load_cursor(cursor) if cursor else None
+    if after is not None and (
+            len(after) != 2
+            or not all(isinstance(value, (int, float)) for value in after)):
+        after = None
+    hits = get_backend().search(terms, after, per_page + 1) if terms else []
+    next_cursor = None
+    if len(hits) > per_page:
+        hits = hits[:per_page]
+        next_cursor = dump_cursor(hits[-1])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [post_id for _, post_id in hits])
+    object_list = [posts[post_id] for _, post_id in hits if post_id in posts]
+    return CursorPage(object_list, None, cursor, next_cursor)
@@ -0,0 +1,168 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (caching, counters, follow_graph, search, thumbnails,
+               timeline, trending)
+from .models import Comment, Follow, Group, Post
+
+# Посты, которые удаляются в этом потоке: каскадное удаление их
+# комментариев не должно по одному обновлять кэш. Ключ — id поста,
+# значение — функция, снимающая пометку после коммита.
+_deleting = threading.local()
+
+
+def _post_deleting(post_id):
+    marks = getattr(_deleting, 'posts', {})
+    unmark = marks.get(post_id)
+    if unmark is None:
+        return False
+    # Откат удаления выбрасывает функции on_commit вместе с unmark:
+    # такая пометка устарела.
+    pending = transaction.get_connection().run_on_commit
+    if not any(entry[1] is unmark for entry in pending):
+        marks.pop(post_id, None)
+        return False
+    return True
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, 'followers', 1)
+        follow_graph.changed(instance.user_id, instance.author_id)
+        timeline.follow(instance.user_id, instance.author_id)
+        caching.bump(caching.feed(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'followers', -1)
+    follow_graph.changed(instance.user_id, instance.author_id)
+    timeline.unfollow(instance.user_id, instance.author_id)
+    caching.bump(caching.feed(instance.user_id))
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_previous(sender, instance, raw=False, **kwargs):
+    instance._previous_group_id = instance._previous_author_id = None
+    instance._previous_image = None
+    if instance.pk and not raw:
+        (instance._previous_group_id, instance._previous_author_id,
+         instance._previous_image) = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'author_id', 'image').first()
+            or (None, None, None))
+
+
+@receiver(post_save, sender=Post)
+def post_queue_thumbnails(sender, instance, raw=False, **kwargs):
+    name = instance.image.name
+    if name and not raw and name != instance._previous_image:
+        transaction.on_commit(lambda: thumbnails.schedule(name))
+
+
+@receiver(post_save, sender=Post)
+def post_count_saved(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_author_id', None)
+    if created and not raw:
+        counters.change(instance.author_id, 'posts', 1)
+    elif previous is not None and previous != instance.author_id:
+        counters.change(previous, 'posts', -1)
+        counters.change(instance.author_id, 'posts', 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_count_deleted(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'posts', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    scopes = {
+        caching.INDEX,
+        caching.profile(instance.author_id),
+        caching.post(instance.pk),
+    }
+    for group_id in (instance.group_id,
+                     getattr(instance, '_previous_group_id', None)):
+        if group_id is not None:
+            scopes.add(caching.group(group_id))
+    for author_id in {instance.author_id,
+                      getattr(instance, '_previous_author_id', None)}:
+        if author_id is not None:
+            scopes.update(timeline.follower_feeds(author_id))
+    caching.bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    # Страницу удаляемого поста инвалидирует post_changed.
+    if not _post_deleting(instance.post_id):
+        caching.bump(caching.post(instance.post_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_trending(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        post_id, created = instance.post_id, instance.created
+        transaction.on_commit(lambda: trending.add(post_id, created))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_untrending(sender, instance, **kwargs):
+    if _post_deleting(instance.post_id):
+        # Пост целиком убирает post_untrending.
+        return
+    post_id, created = instance.post_id, instance.created
+    transaction.on_commit(lambda: trending.add(post_id, created, sign=-1))
+
+
+@receiver(pre_delete, sender=Post)
+def post_mark_deleting(sender, instance, using, **kwargs):
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = {}
+    post_id = instance.pk
+
+    def unmark():
+        _deleting.posts.pop(post_id, None)
+
+    # Collector.delete() всегда в транзакции, так что unmark ждёт коммита.
+    transaction.on_commit(unmark, using=using)
+    _deleting.posts[post_id] = unmark
+
+
+@receiver(post_delete, sender=Post)
+def post_untrending(sender, instance, **kwargs):
+    # Комментарии удаляются раньше поста, пометка больше не нужна.
+    _deleting.posts.pop(instance.pk, None)
+    post_id = instance.pk
+    transaction.on_commit(lambda: trending.remove(post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    caching.bump(caching.INDEX, caching.GROUPS, caching.group(instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def post_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindex(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
@@ -0,0 +1,14 @@
+from django import template
+
+from posts.paginators import elided_page_range
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page_obj):
+    """Номера ссылок пагинатора вместо всего page_range."""
+    paginator = page_obj.paginator
+    return elided_page_range(
+        page_obj.number, paginator.num_pages,
+        show_last=not getattr(paginator, 'approximate', False))
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.thumbnails import ready_or_original
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(image, geometry_string, **options):
+    """Миниатюра, если она уже создана в фоне, иначе оригинал."""
+    return ready_or_original(image, geometry_string, **options)
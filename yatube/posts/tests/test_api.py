@@ -0,0 +1,99 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+POSTS = 25
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='slug', description='Описание')
+        Post.objects.bulk_create(
+            Post(author=cls.author if i % 2 else cls.other,
+                 group=cls.group if i % 3 else None,
+                 text=f'Пост {i}')
+            for i in range(POSTS))
+        cls.post = Post.objects.order_by('pk').last()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.other, text=f'Комментарий {i}')
+            for i in range(5))
+
+    def pages(self, url, **params):
+        ids = []
+        cursor = ''
+        while True:
+            data = self.client.get(url, {'cursor': cursor, **params}).json()
+            ids.extend(row['id'] for row in data['results'])
+            if data['next_cursor'] is None:
+                return ids
+            cursor = data['next_cursor']
+
+    def test_feeds(self):
+        """Каждая лента листается курсором целиком и без повторов."""
+        newest = Post.objects.order_by('-pub_date', '-pk')
+        feeds = {
+            reverse('posts:api_index'): newest,
+            reverse('posts:api_group_posts', args=['slug']):
+                newest.filter(group=self.group),
+            reverse('posts:api_profile', args=['author']):
+                newest.filter(author=self.author),
+        }
+        for url, expected in feeds.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.pages(url, limit=7),
+                    list(expected.values_list('pk', flat=True)))
+
+    def test_post_fields(self):
+        data = self.client.get(
+            reverse('posts:api_index'), {'limit': 1}).json()
+        self.assertEqual(data['results'], [{
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': DjangoJSONEncoder().default(self.post.pub_date),
+            'author': self.post.author.username,
+            'group': None,
+            'image': None,
+        }])
+
+    def test_comments(self):
+        url = reverse('posts:api_comments', args=[self.post.pk])
+        self.assertEqual(
+            self.pages(url, limit=2),
+            list(self.post.comments.order_by('-created', '-pk')
+                 .values_list('pk', flat=True)))
+
+    def test_unknown_objects(self):
+        for url in (reverse('posts:api_group_posts', args=['missing']),
+                    reverse('posts:api_profile', args=['missing']),
+                    reverse('posts:api_comments', args=[0])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_export_streams_all_posts(self):
+        response = self.client.get(reverse('posts:api_export'))
+        self.assertTrue(response.streaming)
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(
+            [row['id'] for row in rows],
+            list(Post.objects.order_by('pk').values_list('pk', flat=True)))
+
+    def test_export_resumes_after_id(self):
+        after = Post.objects.order_by('pk')[10].pk
+        response = self.client.get(
+            reverse('posts:api_export'), {'after': after})
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(rows[0]['id'], after + 1)
+        self.assertEqual(len(rows), POSTS - 11)
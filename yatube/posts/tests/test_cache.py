@@ -1,10 +1,16 @@
+import multiprocessing
+
 from django.core.cache import cache
-from posts.models import Post, User
+from django.db import transaction
+from posts import caching
+from posts.models import Comment, Follow, Group, Post, User
 from django.urls import reverse
-from django.test import TestCase
+from django.test import (Client, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
 
 
 INDEX = reverse('posts:index')
+FOLLOW_INDEX = reverse('posts:follow_index')
 
 
 class CacheTests(TestCase):
@@ -12,17 +18,169 @@ class CacheTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.test_user = User.objects.create(username='ivan')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
         cls.post = Post.objects.create(
             text='Тестовое описание поста',
-            author=cls.test_user,)
+            author=cls.test_user,
+            group=cls.group,)
+
+    def setUp(self):
+        cache.clear()
 
     def test_pages_uses_correct_template(self):
         """Кэширование на главной странице работает корректно"""
         response = self.client.get(INDEX)
         cached_content = response.content
-        Post.objects.create(text='Тестовый пост', author=self.test_user)
+        # update() не вызывает сигналы: фрагмент остаётся в кэше.
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый')
         response = self.client.get(INDEX)
         self.assertEqual(cached_content, response.content)
         cache.clear()
         response = self.client.get(INDEX)
         self.assertNotEqual(cached_content, response.content)
+
+    def test_pages_invalidated_on_post_save(self):
+        """Новый пост сразу виден на главной, в группе и в профиле."""
+        urls = [
+            INDEX,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'ivan'}),
+        ]
+        for url in urls:
+            self.client.get(url)
+        Post.objects.create(
+            text='Свежий пост', author=self.test_user, group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_group_pages_invalidated_on_group_change(self):
+        """Перенос поста в другую группу обновляет обе группы."""
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        old_url = reverse('posts:group_list', kwargs={'slug': 'slug'})
+        new_url = reverse('posts:group_list', kwargs={'slug': 'other'})
+        self.client.get(old_url)
+        self.client.get(new_url)
+        self.post.group = other
+        self.post.save()
+        self.assertNotContains(self.client.get(old_url), self.post.text)
+        self.assertContains(self.client.get(new_url), self.post.text)
+        self.post.group = self.group
+        self.post.save()
+
+    def test_comments_invalidated_on_comment_save(self):
+        """Новый комментарий сразу виден на странице поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.test_user, text='Свежий комментарий')
+        self.assertContains(self.client.get(url), 'Свежий комментарий')
+
+
+class FollowCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.first = User.objects.create(username='first')
+        cls.second = User.objects.create(username='second')
+        cls.reader = User.objects.create(username='reader')
+        cls.other_reader = User.objects.create(username='other_reader')
+        cls.first_post = Post.objects.create(
+            text='Пост первого автора', author=cls.first)
+        cls.second_post = Post.objects.create(
+            text='Пост второго автора', author=cls.second)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.other_client = Client()
+        self.other_client.force_login(self.other_reader)
+
+    def test_feeds_isolated_between_users(self):
+        """Каждый видит свою ленту, а не закэшированную чужую."""
+        Follow.objects.create(user=self.reader, author=self.first)
+        Follow.objects.create(user=self.other_reader, author=self.second)
+        response = self.reader_client.get(FOLLOW_INDEX)
+        self.assertContains(response, self.first_post.text)
+        response = self.other_client.get(FOLLOW_INDEX)
+        self.assertContains(response, self.second_post.text)
+        self.assertNotContains(response, self.first_post.text)
+
+    def test_feed_invalidated_on_follow_and_unfollow(self):
+        self.reader_client.get(FOLLOW_INDEX)
+        follow = Follow.objects.create(user=self.reader, author=self.first)
+        self.assertContains(
+            self.reader_client.get(FOLLOW_INDEX), self.first_post.text)
+        follow.delete()
+        self.assertNotContains(
+            self.reader_client.get(FOLLOW_INDEX), self.first_post.text)
+
+    def test_feed_invalidated_on_author_post(self):
+        """Новый и изменённый пост автора сразу видны подписчику."""
+        Follow.objects.create(user=self.reader, author=self.first)
+        self.reader_client.get(FOLLOW_INDEX)
+        post = Post.objects.create(text='Свежий пост', author=self.first)
+        self.assertContains(self.reader_client.get(FOLLOW_INDEX), post.text)
+        post.text = 'Исправленный пост'
+        post.save()
+        self.assertContains(self.reader_client.get(FOLLOW_INDEX), post.text)
+
+    def test_feed_cached_until_change(self):
+        Follow.objects.create(user=self.reader, author=self.first)
+        self.reader_client.get(FOLLOW_INDEX)
+        # Сессия, пользователь и популярные авторы; число постов и
+        # страница ленты берутся из кэша.
+        with self.assertNumQueries(3):
+            self.reader_client.get(FOLLOW_INDEX)
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_post_invalidates_feed(self):
+        """Посты популярного автора читаются при чтении, и его новые
+        посты всё равно сбрасывают кэш ленты."""
+        Follow.objects.create(user=self.reader, author=self.first)
+        self.reader_client.get(FOLLOW_INDEX)
+        post = Post.objects.create(text='Свежий пост', author=self.first)
+        self.assertContains(self.reader_client.get(FOLLOW_INDEX), post.text)
+
+
+class BumpOnCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def test_bump_repeated_after_commit(self):
+        """Версия, прочитанная до коммита записи, после него устаревает."""
+        with transaction.atomic():
+            Post.objects.create(author=self.user, text='Новый пост')
+            inside = caching.version(caching.INDEX)
+        self.assertNotEqual(caching.version(caching.INDEX), inside)
+
+    def test_rolled_back_write_not_repeated(self):
+        """Откаченная запись не увеличивает версию второй раз."""
+        before = caching.version(caching.INDEX)
+        try:
+            with transaction.atomic():
+                Post.objects.create(author=self.user, text='Новый пост')
+                inside = caching.version(caching.INDEX)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertNotEqual(before, inside)
+        self.assertEqual(caching.version(caching.INDEX), inside)
+
+
+class SharedVersionTests(SimpleTestCase):
+    def test_bump_visible_to_other_processes(self):
+        """Инвалидация из другого воркера видна этому процессу."""
+        before = caching.version(caching.INDEX)
+        worker = multiprocessing.get_context('fork').Process(
+            target=caching.bump, args=(caching.INDEX,))
+        worker.start()
+        worker.join()
+        self.assertNotEqual(caching.version(caching.INDEX), before)
@@ -1,7 +1,11 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Comment, Post, User
+from posts.views import NUMBER_OF_COMMENTS
 
 
 class CommentTests(TestCase):
@@ -36,3 +40,79 @@ class CommentTests(TestCase):
         count_comments = Comment.objects.count()
         self.guest_client.post(CommentTests.comment_url)
         self.assertEqual(count_comments, Comment.objects.count())
+
+
+class CommentPaginationTests(TestCase):
+    TOTAL = 45
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='commenter')
+        cls.post = Post.objects.create(text='Вирусный пост', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(cls.TOTAL))
+        cls.url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.comments_url = reverse('posts:comments', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def newest(self):
+        return list(self.post.comments.order_by('-created', '-pk'))
+
+    def test_first_page_inline(self):
+        """На странице поста только первая страница и общее число."""
+        response = self.client.get(self.url)
+        page = response.context['comments']
+        self.assertEqual(list(page), self.newest()[:NUMBER_OF_COMMENTS])
+        self.assertContains(response, f'Комментарии: {self.TOTAL}')
+        self.assertContains(response, 'data-comments-more')
+
+    def test_fragment_pages(self):
+        """Фрагменты по курсору отдают все комментарии ровно по разу."""
+        seen = []
+        cursor = ''
+        while True:
+            response = self.client.get(self.comments_url, {'cursor': cursor})
+            page = response.context['comments']
+            seen.extend(page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.newest())
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_fragment_of_missing_post(self):
+        """Комментарии несуществующего поста — 404."""
+        url = reverse('posts:comments', args=[self.post.pk + 100])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(
+            self.client.get(url, {'format': 'json'}).status_code, 404)
+
+    def test_broken_cursor_is_first_page(self):
+        """Испорченный курсор не создаёт отдельную запись в кэше."""
+        self.client.get(self.comments_url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.comments_url, {'cursor': 'x' * 500})
+        self.assertFalse(any('posts_comment' in query['sql']
+                             for query in queries))
+        self.assertContains(response, f'Комментарий {self.TOTAL - 1}')
+
+    def test_json(self):
+        response = self.client.get(self.comments_url, {'format': 'json'})
+        data = response.json()
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            [comment.pk for comment in self.newest()[:NUMBER_OF_COMMENTS]])
+        self.assertIsNotNone(data['next_cursor'])
+
+    def test_first_page_cached(self):
+        """Повторный показ не читает комментарии и их число из БД."""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse(any(
+            'posts_comment' in query['sql'] for query in queries))
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='slug', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=['slug']),
+            'profile': reverse('posts:profile', args=['author']),
+            'post_detail': reverse('posts:post_detail', args=[cls.post.pk]),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.client).get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
+    def test_not_modified_without_rendering(self):
+        """Совпавшие валидаторы дают 304 без шаблонов и выборки постов."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertNotIn('private', response['Cache-Control'])
+                with CaptureQueriesContext(connection) as queries:
+                    repeat = self.revalidate(url, response)
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.content, b'')
+                self.assertIsNone(repeat.context)
+                self.assertEqual(repeat['ETag'], response['ETag'])
+                self.assertFalse(any(
+                    '"posts_post"."text"' in query['sql']
+                    for query in queries))
+
+    def test_changes_invalidate(self):
+        """Правка поста, комментарий и подписка меняют валидаторы."""
+        changes = {
+            'index': lambda: Post.objects.filter(pk=self.post.pk).first()
+            .save(),
+            'group_list': lambda: Post.objects.create(
+                author=self.author, text='Ещё', group=self.group),
+            'post_detail': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'),
+        }
+        for name, change in changes.items():
+            with self.subTest(name=name):
+                url = self.urls[name]
+                response = self.client.get(url)
+                change()
+                self.assertEqual(
+                    self.revalidate(url, response).status_code, 200)
+
+    def test_group_rename_invalidates_post_detail(self):
+        url = self.urls['post_detail']
+        response = self.client.get(url)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_depends_on_user(self):
+        url = self.urls['profile']
+        response = self.client.get(url)
+        self.assertEqual(
+            self.revalidate(url, response, self.reader_client).status_code,
+            200)
+        response = self.reader_client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.revalidate(url, response, self.reader_client).status_code,
+            200)
+
+    def test_query_string(self):
+        url = self.urls['index']
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(
+            url, {'page': 2},
+            HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
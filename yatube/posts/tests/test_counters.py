@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters
+from ..models import AuthorStats, Follow, Post
+
+User = get_user_model()
+
+
+class AuthorCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user=None):
+        return AuthorStats.objects.get(pk=(user or self.author).pk)
+
+    def test_post_create_and_delete_update_counter(self):
+        """Создание и удаление поста меняют счётчик автора."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.create(author=self.author, text='Ещё пост')
+        self.assertEqual(self.stats().posts, 2)
+        post.delete()
+        self.assertEqual(self.stats().posts, 1)
+
+    def test_author_change_moves_counter(self):
+        """Смена автора переносит пост между счётчиками."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        post.author = self.reader
+        post.save()
+        self.assertEqual(self.stats().posts, 0)
+        self.assertEqual(self.stats(self.reader).posts, 1)
+
+    def test_counter_rolls_back_with_post(self):
+        """Откат транзакции откатывает и счётчик."""
+        Post.objects.create(author=self.author, text='Пост')
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Post.objects.create(author=self.author, text='Откат')
+                raise RuntimeError
+        self.assertEqual(self.stats().posts, 1)
+
+    def test_pages_read_counter(self):
+        """Профиль и пост берут число постов из счётчика."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.filter(pk=self.author.pk).update(posts=42)
+        for url in (reverse('posts:profile', args=['author']),
+                    reverse('posts:post_detail', args=[post.pk])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).context['post_num'], 42)
+
+    def test_command_verifies_and_rebuilds(self):
+        """Команда находит расхождения и исправляет их."""
+        Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.filter(pk=self.author.pk).update(
+            posts=5, followers=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', verify=True,
+                         stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(counters.mismatches(), [])
+        self.assertEqual(self.stats().posts, 1)
+        self.assertEqual(self.stats().followers, 1)
+
+    def test_rebuild_without_id_lists(self):
+        """Пересчёт не перечисляет id авторов в IN (...)."""
+        authors = [User.objects.create_user(username=f'user{i}')
+                   for i in range(10)]
+        Post.objects.bulk_create(
+            Post(author=author, text='Пост') for author in authors)
+        AuthorStats.objects.all().delete()
+        with CaptureQueriesContext(connection) as context:
+            counters.rebuild()
+        self.assertEqual(counters.mismatches(), [])
+        self.assertFalse([query['sql'] for query in context.captured_queries
+                          if ' IN (' in query['sql']])
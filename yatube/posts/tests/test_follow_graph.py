@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(4)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sorted_arrays(self):
+        for author in reversed(self.authors[:3]):
+            Follow.objects.create(user=self.reader, author=author)
+        self.assertEqual(list(follow_graph.following(self.reader.pk)),
+                         sorted(author.pk for author in self.authors[:3]))
+        self.assertEqual(list(follow_graph.followers(self.authors[0].pk)),
+                         [self.reader.pk])
+
+    def test_lookup_without_sql(self):
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        follow_graph.following(self.reader.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.is_following(
+                self.reader.pk, self.authors[1].pk))
+            self.assertFalse(follow_graph.is_following(
+                self.reader.pk, self.authors[2].pk))
+
+    def test_signals_keep_index_current(self):
+        author = self.authors[0]
+        self.assertFalse(follow_graph.is_following(self.reader.pk, author.pk))
+        follow = Follow.objects.create(user=self.reader, author=author)
+        self.assertTrue(follow_graph.is_following(self.reader.pk, author.pk))
+        self.assertEqual(list(follow_graph.followers(author.pk)),
+                         [self.reader.pk])
+        follow.delete()
+        self.assertFalse(follow_graph.is_following(self.reader.pk, author.pk))
+        self.assertEqual(list(follow_graph.followers(author.pk)), [])
+
+    def test_stale_index_does_not_block_follow(self):
+        """Устаревший кэш подписок не мешает подписаться снова."""
+        author = self.authors[0]
+        follow = Follow.objects.create(user=self.reader, author=author)
+        follow_graph.following(self.reader.pk)
+        # Отписку обработал другой процесс: наш кэш о ней не знает.
+        with mock.patch.object(follow_graph, 'changed'):
+            follow.delete()
+        self.assertTrue(follow_graph.is_following(self.reader.pk, author.pk))
+        client = Client()
+        client.force_login(self.reader)
+        client.get(reverse('posts:profile_follow',
+                           kwargs={'username': author.username}))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=author).exists())
+
+    def test_fan_out_reads_follow_table(self):
+        """Новый пост раскладывается по Follow, а не по кэшу."""
+        author = self.authors[0]
+        follow_graph.followers(author.pk)
+        with mock.patch.object(follow_graph, 'changed'):
+            Follow.objects.create(user=self.reader, author=author)
+        post = Post.objects.create(author=author, text='Пост')
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=post).exists())
+
+    def test_profile_checks_follow_without_sql(self):
+        """Повторный показ профиля не обращается к таблице подписок."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', kwargs={'username': 'author0'})
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertFalse(any(Follow._meta.db_table in query['sql']
+                             for query in context.captured_queries))
@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters, search
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='slug', description='Описание')
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def write_jsonl(self, name, rows):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for row in rows:
+                file.write(
+                    row if isinstance(row, str)
+                    else json.dumps(row, ensure_ascii=False))
+                file.write('\n')
+        return path
+
+    def run_import(self, *args, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_content', *args, stdout=out, stderr=err,
+                     **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_posts_comments_follows(self):
+        posts = self.write_jsonl('posts.jsonl', [
+            {'id': 100 + i, 'author': 'author', 'group': 'slug',
+             'text': f'Импортированный пост {i}',
+             'pub_date': f'2020-01-0{i + 1}T10:00:00+00:00'}
+            for i in range(5)
+        ])
+        comments = self.write_jsonl('comments.jsonl', [
+            {'post': 104, 'author': 'reader', 'text': 'Комментарий'},
+        ])
+        follows = self.write_jsonl('follows.jsonl', [
+            {'user': 'reader', 'author': 'author'},
+            {'user': 'reader', 'author': 'author'},
+        ])
+        out, _ = self.run_import('posts', posts, chunk_size=2)
+        self.run_import('comments', comments)
+        self.run_import('follows', follows)
+        self.assertIn('Импортировано: 5', out)
+        self.assertIn('строк в секунду', out)
+        post = Post.objects.get(pk=104)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.day, 5)
+        self.assertEqual(post.comments.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(counters.mismatches(), [])
+        self.assertEqual(counters.get(self.author.pk, 'posts'), 5)
+        self.assertEqual(
+            len(search.search_page('импортированный', None, 10)), 5)
+
+    def test_csv(self):
+        path = os.path.join(self.dir, 'posts.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, ['author', 'text', 'group'])
+            writer.writeheader()
+            writer.writerow({'author': 'author', 'text': 'Из CSV',
+                             'group': ''})
+        self.run_import('posts', path)
+        self.assertTrue(Post.objects.filter(text='Из CSV').exists())
+
+    def test_bad_rows_skipped(self):
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'author', 'text': 'Хороший пост'},
+            {'author': 'nobody', 'text': 'Неизвестный автор'},
+            {'author': 'author', 'text': 'Группа', 'group': 'missing'},
+            {'author': 'author', 'text': ''},
+            'не JSON',
+        ])
+        out, err = self.run_import('posts', path, skip_derived=True)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertIn('ошибок: 4', out)
+        self.assertIn('Строка 2', err)
+        self.assertEqual(Comment.objects.count(), 0)
+
+    def test_rejected_row_keeps_id_free(self):
+        """Дата вне диапазона — ошибка строки, её id не занимается."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'id': 200, 'author': 'author', 'text': 'Плохая дата',
+             'pub_date': '2020-13-01T00:00:00'},
+            {'id': 200, 'author': 'author', 'text': 'Хороший пост'},
+            {'id': 201, 'author': 'nobody', 'text': 'Неизвестный автор'},
+            {'id': 201, 'author': 'author', 'text': 'Тоже хороший'},
+        ])
+        out, err = self.run_import('posts', path, skip_derived=True)
+        self.assertIn('ошибок: 2', out)
+        self.assertIn('неверная дата', err)
+        self.assertEqual(Post.objects.get(pk=200).text, 'Хороший пост')
+        self.assertEqual(Post.objects.get(pk=201).text, 'Тоже хороший')
+
+    def test_wrong_types_are_row_errors(self):
+        """Значения не того типа отбрасывают строку, а не весь импорт."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'author', 'text': 5},
+            {'author': ['author'], 'text': 'Список'},
+            {'author': 'author', 'text': 'Дата', 'pub_date': 20200101},
+            {'id': 1.5, 'author': 'author', 'text': 'Дробный id'},
+            {'author': 'author', 'text': 'Хороший пост'},
+        ])
+        out, err = self.run_import('posts', path, skip_derived=True)
+        self.assertIn('ошибок: 4', out)
+        self.assertIn('поле text должно быть строкой', err)
+        self.assertEqual(Post.objects.get().text, 'Хороший пост')
+
+    def test_csv_errors_report_file_lines(self):
+        """Ошибка CSV указывает строку файла, а не номер записи."""
+        path = os.path.join(self.dir, 'posts.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, ['author', 'text'])
+            writer.writeheader()
+            writer.writerow({'author': 'author', 'text': 'Три\nстроки\n'})
+            writer.writerow({'author': 'nobody', 'text': 'Ошибка'})
+        _, err = self.run_import('posts', path, skip_derived=True)
+        self.assertIn('Строка 5:', err)
+
+    def test_create_missing(self):
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'newcomer', 'text': 'Пост', 'group': 'new'},
+        ])
+        self.run_import('posts', path, create_missing=True,
+                        skip_derived=True)
+        post = Post.objects.get()
+        self.assertEqual(post.author.username, 'newcomer')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.group.slug, 'new')
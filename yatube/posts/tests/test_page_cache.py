@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..page_cache import HEADER
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'group'}),
+            'other_group': reverse(
+                'posts:group_list', kwargs={'slug': 'other'}),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': 'author'}),
+            'post': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def cached(self, name):
+        return self.client.get(self.urls[name]).get(HEADER) == 'hit'
+
+    def warm(self):
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def test_anonymous_page_served_from_cache(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                first = self.client.get(url)
+                self.assertEqual(first[HEADER], 'miss')
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second[HEADER], 'hit')
+                self.assertEqual(second.content, first.content)
+
+    def test_requests_with_cookies_not_cached(self):
+        self.warm()
+        self.client.cookies['sessionid'] = 'anything'
+        self.assertFalse(self.cached('index'))
+        user_client = Client()
+        user_client.force_login(self.author)
+        response = user_client.get(self.urls['index'])
+        self.assertNotIn(HEADER, response)
+
+    def test_conditional_get_on_hit(self):
+        etag = self.client.get(self.urls['index'])['ETag']
+        response = self.client.get(
+            self.urls['index'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_save_purges_its_pages(self):
+        """Новый пост сбрасывает только страницы, на которых он есть."""
+        self.warm()
+        Post.objects.create(author=self.author, text='Новый',
+                            group=self.other_group)
+        self.assertFalse(self.cached('index'))
+        self.assertFalse(self.cached('other_group'))
+        self.assertFalse(self.cached('profile'))
+        self.assertTrue(self.cached('group'))
+
+    def test_comment_save_purges_post_page(self):
+        self.warm()
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Комментарий')
+        self.assertContains(self.client.get(self.urls['post']), 'Комментарий')
+        self.assertTrue(self.cached('index'))
+        self.assertTrue(self.cached('profile'))
+
+    def test_group_save_purges_group_page(self):
+        self.warm()
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(self.client.get(self.urls['group']),
+                            'Новое название')
+        self.assertTrue(self.cached('other_group'))
+
+    def test_group_save_purges_post_page(self):
+        self.warm()
+        self.group.title = 'Новое название'
+        self.group.save()
+        response = self.client.get(self.urls['post'])
+        self.assertNotEqual(response.get(HEADER), 'hit')
+        self.assertContains(response, 'Новое название')
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.warm()
+        self.assertFalse(self.cached('index'))
@@ -0,0 +1,231 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.db import connection
+from django.http import Http404
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import caching
+from ..models import Group, Post
+from ..paginators import (CachedCountPaginator, CursorPage, CursorPaginator,
+                          elided_page_range)
+
+User = get_user_model()
+
+PER_PAGE = 10
+POSTS_COUNT = 25
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
+        # bulk_create даёт одинаковый pub_date — порядок держит id.
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}', group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True))
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), PER_PAGE)
+
+    def test_forward_pages_cover_feed(self):
+        """Листание вперёд проходит ленту без пропусков и повторов."""
+        seen = []
+        page = self.paginator.get_page(None)
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            page = self.paginator.get_page(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+
+    def test_backward_page_returns_previous_posts(self):
+        """Курсор назад возвращает предыдущую страницу в прямом порядке."""
+        first = self.paginator.get_page(None)
+        second = self.paginator.get_page(first.next_cursor)
+        back = self.paginator.get_page(second.previous_cursor)
+        self.assertEqual([post.pk for post in back], self.expected[:PER_PAGE])
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор не ломает страницу, а отдаёт начало ленты."""
+        for cursor in ('garbage', 'W10', 'WyJ4IiwxXQ'):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(
+                    [post.pk for post in page], self.expected[:PER_PAGE])
+
+    def test_cursor_page_has_no_numbers(self):
+        """У курсорной страницы нет номеров соседних страниц."""
+        page = self.paginator.get_page(None)
+        for method in (page.next_page_number, page.previous_page_number):
+            with self.subTest(method=method.__name__):
+                with self.assertRaises(InvalidPage):
+                    method()
+
+    def test_cursor_page_skips_count(self):
+        """Страница по курсору не выполняет COUNT(*)."""
+        cursor = self.paginator.get_page(None).next_cursor
+        with self.assertNumQueries(1):
+            list(self.paginator.get_page(cursor))
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_views_use_cursor_mode(self):
+        """В курсорном режиме ленты отдают CursorPage и ссылки курсора."""
+        client = Client()
+        url_pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+        for url in url_pages:
+            with self.subTest(url=url):
+                response = client.get(url)
+                page_obj = response.context['page_obj']
+                self.assertIsInstance(page_obj, CursorPage)
+                self.assertEqual(len(page_obj), PER_PAGE)
+                self.assertContains(
+                    response, f'?cursor={page_obj.next_cursor}')
+                response = client.get(url, {'cursor': page_obj.next_cursor})
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    self.expected[PER_PAGE:2 * PER_PAGE])
+
+
+class ElidedPageRangeTests(TestCase):
+    def test_short_range_not_elided(self):
+        self.assertEqual(elided_page_range(1, 10), list(range(1, 11)))
+
+    def test_window_around_current_page(self):
+        self.assertEqual(
+            elided_page_range(50, 100),
+            [1, 2, None, 47, 48, 49, 50, 51, 52, 53, None, 99, 100])
+
+    def test_window_at_edges(self):
+        self.assertEqual(elided_page_range(1, 100),
+                         [1, 2, 3, 4, None, 99, 100])
+        self.assertEqual(elided_page_range(100, 100),
+                         [1, 2, None, 97, 98, 99, 100])
+
+    def test_without_last_pages(self):
+        self.assertEqual(elided_page_range(1, 100, show_last=False),
+                         [1, 2, 3, 4, None])
+
+    def test_index_renders_window(self):
+        """На главной нет ссылок на все страницы."""
+        user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=user, text=f'Пост {i}') for i in range(PER_PAGE * 30))
+        cache.clear()
+        response = Client().get(reverse('posts:index'), {'page': 15})
+        self.assertContains(response, '?page=12"')
+        self.assertContains(response, '?page=30"')
+        self.assertNotContains(response, '?page=5"')
+        self.assertContains(response, '&hellip;', count=2)
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}',
+                 group=cls.group if i % 2 else None)
+            for i in range(POSTS_COUNT)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self, queryset=None, scopes=(caching.INDEX,)):
+        if queryset is None:
+            queryset = Post.objects.all()
+        return CachedCountPaginator(queryset, PER_PAGE, scopes)
+
+    def test_count_cached(self):
+        """Повторный подсчёт берётся из кэша, без COUNT(*)."""
+        self.assertEqual(self.paginator().count, POSTS_COUNT)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginator().count, POSTS_COUNT)
+
+    def test_count_invalidated_on_write(self):
+        """Новый пост меняет ключ числа в кэше."""
+        self.paginator().count
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(self.paginator().count, POSTS_COUNT + 1)
+
+    def test_key_depends_on_queryset(self):
+        """У разных выборок разные числа в кэше."""
+        self.paginator().count
+        self.assertEqual(
+            self.paginator(Post.objects.filter(group=self.group)).count,
+            POSTS_COUNT // 2)
+
+    def test_without_scopes_not_cached(self):
+        """Без областей число считается каждый раз."""
+        self.paginator(scopes=()).count
+        with self.assertNumQueries(1):
+            self.paginator(scopes=()).count
+
+    @override_settings(POSTS_APPROXIMATE_COUNT=True,
+                       POSTS_APPROXIMATE_COUNT_THRESHOLD=POSTS_COUNT)
+    def test_approximate_count(self):
+        """Для всей большой таблицы число берётся из статистики СУБД."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Статистика проверяется на SQLite.')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Вне статистики') for _ in range(3))
+        paginator = self.paginator()
+        self.assertEqual(paginator.count, POSTS_COUNT)
+        self.assertTrue(paginator.approximate)
+        filtered = self.paginator(Post.objects.filter(group=self.group))
+        self.assertEqual(filtered.count, POSTS_COUNT // 2)
+        self.assertFalse(filtered.approximate)
+        response = Client().get(reverse('posts:index'))
+        self.assertTrue(response.context['page_obj'].paginator.approximate)
+        self.assertNotContains(response, 'Последняя')
+
+    @override_settings(POSTS_APPROXIMATE_COUNT=True,
+                       POSTS_APPROXIMATE_COUNT_THRESHOLD=POSTS_COUNT)
+    def test_approximate_pages_not_clamped(self):
+        """При оценке номер страницы не подгоняется под число страниц."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Статистика проверяется на SQLite.')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Вне статистики')
+            for _ in range(PER_PAGE))
+        paginator = self.paginator()
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual(len(paginator.get_page(4)), POSTS_COUNT % PER_PAGE)
+        with self.assertRaises(Http404):
+            paginator.get_page(5)
+        Post.objects.filter(text='Вне статистики').delete()
+        Post.objects.filter(pk__in=Post.objects.order_by('pk').values(
+            'pk')[:POSTS_COUNT - PER_PAGE]).delete()
+        cache.clear()
+        url = reverse('posts:index')
+        self.assertEqual(Client().get(url, {'page': 3}).status_code, 404)
+        self.assertEqual(Client().get(url, {'page': 'x'}).status_code, 200)
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+GROW_BY = 5
+
+
+class QueryCountTests(TestCase):
+    """Число запросов каждой страницы не зависит от объёма данных."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+        cls.add_content(1)
+
+    @classmethod
+    def add_content(cls, number):
+        for i in range(number):
+            commenter = User.objects.create_user(
+                username=f'commenter-{number}-{i}')
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=cls.group)
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {i}')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def requests(self):
+        """Все страницы из posts/urls.py: (имя, клиент, метод, url, число)."""
+        post_id = self.post.pk
+        username = self.author.username
+        return [
+            ('index', self.client, 'get', reverse('posts:index'), 4),
+            ('group_list', self.client, 'get',
+             reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+             6),
+            ('profile', self.client, 'get',
+             reverse('posts:profile', kwargs={'username': username}), 7),
+            ('post_detail', self.client, 'get',
+             reverse('posts:post_detail', kwargs={'post_id': post_id}), 6),
+            ('comments', self.client, 'get',
+             reverse('posts:comments', kwargs={'post_id': post_id}), 2),
+            ('search', self.client, 'get',
+             reverse('posts:search') + '?q=Пост', 4),
+            ('post_create', self.client, 'get',
+             reverse('posts:post_create'), 4),
+            ('post_edit', self.author_client, 'get',
+             reverse('posts:post_edit', kwargs={'post_id': post_id}), 5),
+            ('add_comment', self.client, 'post',
+             reverse('posts:add_comment', kwargs={'post_id': post_id}), 4),
+            ('follow_index', self.client, 'get',
+             reverse('posts:follow_index'), 5),
+            # Повторная подписка: вставка в savepoint и IntegrityError.
+            ('profile_follow', self.client, 'get',
+             reverse('posts:profile_follow', kwargs={'username': username}),
+             7),
+            ('profile_unfollow', self.client, 'get',
+             reverse('posts:profile_unfollow',
+                     kwargs={'username': username}), 9),
+        ]
+
+    def count_queries(self, client, method, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            getattr(client, method)(url, {'text': 'Комментарий'}
+                                    if method == 'post' else {})
+        return len(context.captured_queries)
+
+    def test_views_query_count(self):
+        """Каждая страница выполняет фиксированное число запросов."""
+        for name, client, method, url, expected in self.requests():
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.count_queries(client, method, url), expected)
+                Follow.objects.get_or_create(
+                    user=self.user, author=self.author)
+
+    def test_query_count_does_not_grow(self):
+        """Рост числа постов и комментариев не добавляет запросов."""
+        before = {}
+        for name, client, method, url, _ in self.requests():
+            before[name] = self.count_queries(client, method, url)
+            Follow.objects.get_or_create(user=self.user, author=self.author)
+        self.add_content(GROW_BY)
+        for name, client, method, url, _ in self.requests():
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.count_queries(client, method, url), before[name])
+                Follow.objects.get_or_create(
+                    user=self.user, author=self.author)
@@ -0,0 +1,147 @@
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def problems(steps):
+    """Полные просмотры таблиц и индексов, сортировки во временном B-дереве.
+
+    SCAN ... USING INDEX тоже читает весь индекс: искать по нему должен
+    SEARCH с условием на первые столбцы.
+    """
+    found = []
+    for step in steps:
+        if 'TEMP B-TREE' in step:
+            found.append(step)
+        elif (step.startswith('SCAN ') and 'VIRTUAL TABLE' not in step
+              and 'sqlite_master' not in step):
+            found.append(step)
+    return found
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite',
+                     'Планы запросов проверяются для SQLite.')
+class QueryPlanTests(TestCase):
+    """Запросы страниц ищут по индексам и не сортируют результат сами."""
+
+    # Поиск сортирует найденное по рангу: без сортировки не обойтись.
+    # Главная лента — все посты подряд: индекс pub_date читается по
+    # порядку до LIMIT, а COUNT(*) без условий иначе не посчитать.
+    PUB_DATE_SCANS = ('SCAN posts_post USING INDEX posts_post_pub_date',
+                      'SCAN posts_post USING COVERING INDEX '
+                      'posts_post_pub_date')
+    ALLOWED = {
+        'search': ('TEMP B-TREE FOR ORDER BY',),
+        'index': PUB_DATE_SCANS,
+        'api_index': PUB_DATE_SCANS,
+    }
+    # Составной индекс, по которому ищет лента страницы.
+    EXPECTED = {
+        'group_list': 'SEARCH posts_post USING INDEX post_group_pub_date',
+        'profile': 'SEARCH posts_post USING INDEX post_author_pub_date',
+        'post_detail':
+            'SEARCH posts_comment USING INDEX comment_post_created',
+        'comments': 'SEARCH posts_comment USING INDEX comment_post_created',
+        'follow_index':
+            'SEARCH posts_timeline USING INDEX timeline_user_pub_date',
+        'api_group_posts':
+            'SEARCH posts_post USING INDEX post_group_pub_date',
+        'api_profile': 'SEARCH posts_post USING INDEX post_author_pub_date',
+        'api_comments':
+            'SEARCH posts_comment USING INDEX comment_post_created',
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='slug', description='Описание')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def requests(self):
+        post_id = self.post.pk
+        username = self.author.username
+        return [
+            ('index', reverse('posts:index')),
+            ('group_list', reverse('posts:group_list', args=['slug'])),
+            ('profile', reverse('posts:profile', args=[username])),
+            ('post_detail', reverse('posts:post_detail', args=[post_id])),
+            ('comments', reverse('posts:comments', args=[post_id])),
+            ('search', reverse('posts:search') + '?q=Пост'),
+            ('follow_index', reverse('posts:follow_index')),
+            ('api_index', reverse('posts:api_index')),
+            ('api_group_posts',
+             reverse('posts:api_group_posts', args=['slug'])),
+            ('api_profile', reverse('posts:api_profile', args=[username])),
+            ('api_comments', reverse('posts:api_comments', args=[post_id])),
+        ]
+
+    def capture(self, url):
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        cache.clear()
+        with connection.execute_wrapper(record):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return queries
+
+    def test_detects_problems(self):
+        """Полный просмотр таблицы или индекса и сортировка — проблемы."""
+        steps = plan(
+            'SELECT id FROM posts_post WHERE text = %s ORDER BY image', ['x'])
+        self.assertEqual(len(problems(steps)), 2)
+        steps = plan('SELECT id FROM posts_post ORDER BY pub_date', [])
+        self.assertEqual(len(problems(steps)), 1)
+        self.assertIn('USING', problems(steps)[0])
+
+    def test_feeds_search_composite_indexes(self):
+        """Ленты ищут по своему составному индексу, а не просматривают."""
+        for name, url in self.requests():
+            if name not in self.EXPECTED:
+                continue
+            with self.subTest(name=name):
+                steps = [step for sql, params in self.capture(url)
+                         for step in plan(sql, params)]
+                self.assertTrue(any(
+                    step.startswith(self.EXPECTED[name] + ' (')
+                    for step in steps), steps)
+
+    def test_no_full_scans_or_sorts(self):
+        """Запросы страниц не просматривают таблицы и не сортируют сами."""
+        for name, url in self.requests():
+            for sql, params in self.capture(url):
+                with self.subTest(name=name, sql=sql):
+                    found = [
+                        step for step in problems(plan(sql, params))
+                        if not any(allowed in step
+                                   for allowed in self.ALLOWED.get(name, ()))
+                    ]
+                    self.assertEqual(found, [])
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+
+User = get_user_model()
+
+SEARCH = reverse('posts:search')
+PER_PAGE = 10
+
+
+class SearchTestsMixin:
+    backend = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.settings_override = override_settings(
+            POSTS_SEARCH_BACKEND=cls.backend)
+        cls.settings_override.enable()
+        cls.user = User.objects.create_user(username='auth')
+        cls.weak = Post.objects.create(
+            author=cls.user, text='Кошка спит на диване')
+        cls.strong = Post.objects.create(
+            author=cls.user, text='Кошка, кошка, кошка на диване')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Собака гуляет во дворе')
+        for number in range(PER_PAGE * 2):
+            Post.objects.create(author=cls.user, text=f'Кот номер {number}')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        super().tearDownClass()
+
+    def results(self, query, cursor=None):
+        return search.search_page(query, cursor, PER_PAGE)
+
+    def test_backend_is_selected(self):
+        self.assertEqual(search.get_backend().name, self.backend)
+
+    def test_ranked_results(self):
+        """Находятся посты со всеми словами, более частые — выше."""
+        page = self.results('КОШКА диване')
+        self.assertEqual(list(page), [self.strong, self.weak])
+        self.assertEqual(list(self.results('кошка собака')), [])
+
+    def test_cursor_pagination(self):
+        """Курсор проходит все результаты без повторов."""
+        seen = []
+        page = self.results('кот')
+        while True:
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            page = self.results('кот', page.next_cursor)
+        self.assertEqual(len(seen), PER_PAGE * 2)
+        self.assertEqual(len(set(seen)), PER_PAGE * 2)
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.other.text = 'Собака спит на диване'
+        self.other.save()
+        self.assertIn(self.other, list(self.results('собака диване')))
+        self.other.delete()
+        self.assertEqual(list(self.results('собака')), [])
+
+    def test_view(self):
+        """Страница поиска показывает результаты и ссылку дальше."""
+        response = self.client.get(SEARCH, {'q': 'кот'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), PER_PAGE)
+        self.assertContains(
+            response, f'q=%D0%BA%D0%BE%D1%82&cursor={page_obj.next_cursor}')
+        response = self.client.get(SEARCH, {'q': 'кот', 'cursor': 'junk'})
+        self.assertEqual(len(response.context['page_obj']), PER_PAGE)
+
+
+class FTS5SearchTests(SearchTestsMixin, TestCase):
+    backend = 'fts5'
+
+    @override_settings(POSTS_SEARCH_BACKEND=None)
+    def test_availability_checked_once(self):
+        """Наличие FTS5 проверяется один раз, а не на каждый вызов."""
+        search.get_backend()
+        with self.assertNumQueries(0):
+            self.assertEqual(search.get_backend().name, 'fts5')
+
+
+class PythonSearchTests(SearchTestsMixin, TestCase):
+    backend = 'python'
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, Timeline
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+VOLUMES = dict(users=50, groups=3, posts=300, comments=200, follows=400)
+
+
+def seed(**options):
+    call_command('seed', stdout=StringIO(), **{**VOLUMES, **options})
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_volumes_and_derived_data(self):
+        seed(chunk_size=70, images=0.5)
+        self.assertEqual(User.objects.count(), VOLUMES['users'])
+        self.assertEqual(Group.objects.count(), VOLUMES['groups'])
+        self.assertEqual(Post.objects.count(), VOLUMES['posts'])
+        self.assertEqual(Comment.objects.count(), VOLUMES['comments'])
+        self.assertTrue(
+            0 < Follow.objects.count() <= VOLUMES['follows'])
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertEqual(counters.mismatches(), [])
+        self.assertTrue(Timeline.objects.exists())
+
+    def test_comments_not_older_than_posts(self):
+        """Комментарий создан не раньше своего поста."""
+        seed(skip_derived=True)
+        self.assertFalse(Comment.objects.filter(
+            created__lt=F('post__pub_date')).exists())
+
+    def test_power_law_followers(self):
+        """Самый популярный автор собирает заметную долю подписок."""
+        seed(users=500, posts=0, comments=0, follows=2000,
+             skip_derived=True)
+        counts = sorted(
+            Follow.objects.values('author').annotate(
+                total=Count('pk')).values_list('total', flat=True),
+            reverse=True)
+        self.assertGreater(counts[0], 10 * counts[len(counts) // 2])
+
+    def test_deterministic(self):
+        seed(seed=7, skip_derived=True)
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username', 'group__slug'))
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        seed(seed=7, skip_derived=True)
+        second = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username', 'group__slug'))
+        self.assertEqual(first, second)
+
+    def test_same_seed_twice(self):
+        seed(users=2, posts=0, comments=0, follows=0, skip_derived=True)
+        with self.assertRaises(CommandError):
+            seed(users=2, posts=0, comments=0, follows=0)
@@ -0,0 +1,103 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import tasks
+from core.models import Task
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+GEOMETRY, OPTIONS = thumbnails.GEOMETRIES[0]
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_QUEUE=False)
+class ThumbnailTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_fallback_to_original_until_ready(self):
+        """Пока миниатюры нет, шаблон получает оригинал."""
+        with mock.patch.object(thumbnails, 'schedule'):
+            post = self.create_post()
+        image = thumbnails.ready_or_original(post.image, GEOMETRY, **OPTIONS)
+        self.assertEqual(image.url, post.image.url)
+        thumbnails.generate(post.image.name)
+        image = thumbnails.ready_or_original(post.image, GEOMETRY, **OPTIONS)
+        self.assertNotEqual(image.url, post.image.url)
+        self.assertEqual((image.width, image.height), (960, 339))
+
+    def test_save_generates_thumbnails(self):
+        """После сохранения поста миниатюра готова без рендера шаблона."""
+        post = self.create_post()
+        self.assertIsNotNone(thumbnails.backend.get_ready_thumbnail(
+            post.image, GEOMETRY, **OPTIONS))
+
+    @override_settings(POSTS_THUMBNAIL_QUEUE=True)
+    def test_save_queues_task(self):
+        """Генерация уходит в очередь задач, а не в запрос."""
+        post = self.create_post()
+        post.text = 'Без новой картинки'
+        post.save()
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'posts.thumbnails.generate')
+        self.assertEqual(task.key, f'thumbnail:{post.image.name}')
+        self.assertIsNone(thumbnails.backend.get_ready_thumbnail(
+            post.image, GEOMETRY, **OPTIONS))
+        tasks.run_pending()
+        self.assertIsNotNone(thumbnails.backend.get_ready_thumbnail(
+            post.image, GEOMETRY, **OPTIONS))
+
+    @override_settings(POSTS_THUMBNAIL_QUEUE=True)
+    def test_generation_purges_cached_pages(self):
+        """Миниатюра сразу заменяет оригинал в кэшированных страницах."""
+        post = self.create_post()
+        urls = (reverse('posts:index'),
+                reverse('posts:profile', args=[self.user.username]))
+        for url in urls:
+            self.assertContains(self.client.get(url), post.image.url)
+        tasks.run_pending()
+        thumbnail = thumbnails.backend.get_ready_thumbnail(
+            post.image, GEOMETRY, **OPTIONS)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), thumbnail.url)
+
+    def test_command_backfills(self):
+        """Команда создаёт недостающие миниатюры."""
+        with mock.patch.object(thumbnails, 'schedule'):
+            post = self.create_post()
+        call_command('generate_thumbnails', workers=0, stdout=StringIO())
+        self.assertIsNotNone(thumbnails.backend.get_ready_thumbnail(
+            post.image, GEOMETRY, **OPTIONS))
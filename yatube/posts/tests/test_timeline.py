@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import AuthorStats, Follow, Post, Timeline
+
+User = get_user_model()
+
+FOLLOW_INDEX = reverse('posts:follow_index')
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(FOLLOW_INDEX)
+        return list(response.context['page_obj'].object_list)
+
+    def test_follow_backfills_and_new_post_fans_out(self):
+        """Подписка доносит старые посты, новый пост попадает в ленту."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [self.old_post])
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.feed(), [post, self.old_post])
+        self.assertFalse(Timeline.objects.filter(user=self.other).exists())
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}))
+        self.assertEqual(self.feed(), [])
+        self.assertEqual(AuthorStats.objects.get(pk=self.author).followers, 0)
+
+    def test_follow_page_reads_timeline_only(self):
+        """Лента читается из Timeline без соединения с Follow."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        feed = timeline.follow_feed(self.reader)
+        self.assertIs(feed.model, Timeline)
+        self.assertNotIn('posts_follow', str(feed.query))
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=1)
+    def test_heavy_author_read_on_demand(self):
+        """Посты популярного автора подмешиваются при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Для всех')
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+        Follow.objects.get(user=self.other, author=self.author).delete()
+        self.assertTrue(
+            Timeline.objects.filter(post=post, user=self.reader).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    def test_rebuild_restores_timelines(self):
+        """Пересборка восстанавливает ленты и счётчики."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Timeline.objects.all().delete()
+        AuthorStats.objects.all().delete()
+        timeline.rebuild()
+        self.assertEqual(self.feed(), [self.old_post])
+        self.assertEqual(AuthorStats.objects.get(pk=self.author).followers, 1)
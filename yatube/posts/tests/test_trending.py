@@ -0,0 +1,159 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+from .. import caching, trending
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(POSTS_TRENDING_HALF_LIFE=3600, PAGE_CACHE_ENABLED=False)
+class TrendingTests(TransactionTestCase):
+    # Оценки обновляются после коммита, поэтому без обёртки TestCase.
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.posts = [
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+            for i in range(3)]
+        trending.rebuild()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.user, text='Да')
+
+    def test_ranked_by_comments(self):
+        self.comment(self.posts[0])
+        self.comment(self.posts[2], 3)
+        self.comment(self.posts[1], 2)
+        self.assertEqual(
+            trending.top(), [self.posts[2].pk, self.posts[1].pk,
+                             self.posts[0].pk])
+
+    def test_incremental_matches_rebuild(self):
+        self.comment(self.posts[0], 2)
+        self.comment(self.posts[1])
+        incremental = cache.get(trending.KEY)
+        rebuilt = trending.rebuild(incremental['epoch'])
+        self.assertEqual(incremental['scores'].keys(),
+                         rebuilt['scores'].keys())
+        for post_id, score in rebuilt['scores'].items():
+            self.assertAlmostEqual(
+                incremental['scores'][post_id], score, places=6)
+
+    def test_old_comments_decay(self):
+        self.comment(self.posts[0], 3)
+        Comment.objects.update(created=timezone.now() - timedelta(hours=3))
+        self.comment(self.posts[1], 2)
+        trending.rebuild()
+        self.assertEqual(trending.top()[0], self.posts[1].pk)
+
+    def test_rebase_keeps_order(self):
+        self.comment(self.posts[0], 2)
+        self.comment(self.posts[1])
+        state = cache.get(trending.KEY)
+        trending._rebase(state, state['epoch']
+                         + 3600 * trending.REBASE_AFTER)
+        self.assertLess(max(state['scores'].values()), 1)
+        self.assertGreater(state['scores'][self.posts[0].pk],
+                           state['scores'][self.posts[1].pk])
+
+    @override_settings(POSTS_TRENDING_CANDIDATES=2)
+    def test_bounded_size(self):
+        for count, post in enumerate(self.posts, 1):
+            self.comment(post, count)
+        self.assertEqual(len(cache.get(trending.KEY)['scores']), 2)
+        self.assertNotIn(self.posts[0].pk, trending.top())
+
+    def test_deletions(self):
+        self.comment(self.posts[0], 2)
+        self.comment(self.posts[1])
+        Comment.objects.filter(post=self.posts[0]).delete()
+        self.assertEqual(trending.top(), [self.posts[1].pk])
+        Post.objects.filter(pk=self.posts[1].pk).delete()
+        self.assertEqual(trending.top(), [])
+
+    def test_post_delete_skips_per_comment_updates(self):
+        """Каскад комментариев удаляемого поста не трогает кэш по одному."""
+        self.comment(self.posts[0], 20)
+        self.comment(self.posts[1])
+        with mock.patch.object(trending, 'add') as add, \
+                mock.patch.object(caching, 'bump',
+                                  wraps=caching.bump) as bump:
+            Post.objects.filter(pk=self.posts[0].pk).delete()
+        add.assert_not_called()
+        self.assertEqual(bump.call_count, 2)
+        self.assertEqual(trending.top(), [self.posts[1].pk])
+        self.comment(self.posts[1])
+        Comment.objects.filter(post=self.posts[1]).first().delete()
+        self.assertEqual(trending.top(), [self.posts[1].pk])
+
+    def test_page(self):
+        self.comment(self.posts[1], 2)
+        self.comment(self.posts[0])
+        url = reverse('posts:trending')
+        response = self.client.get(url)
+        self.assertEqual(list(response.context['post_list']),
+                         [self.posts[1], self.posts[0]])
+        self.assertContains(response, 'Пост 1')
+        # Повторный показ не зависит от числа комментариев.
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.comment(self.posts[2])
+        self.assertContains(self.client.get(url), 'Пост 2')
+
+    def test_compact_command(self):
+        cache.delete(trending.KEY)
+        self.comment(self.posts[0])
+        self.assertIsNone(cache.get(trending.KEY))
+        output = StringIO()
+        call_command('compact_trending', stdout=output)
+        self.assertIn('1', output.getvalue())
+        self.assertLessEqual(cache.get(trending.KEY)['epoch'], time.time())
+        self.assertEqual(trending.top(), [self.posts[0].pk])
+
+    def test_cache_miss_queues_rebuild(self):
+        """Без оценок в кэше запрос не пересчитывает их сам."""
+        self.comment(self.posts[0])
+        cache.delete(trending.KEY)
+        self.assertEqual(trending.top(), [])
+        trending.top()
+        self.assertEqual(Task.objects.get().name, 'posts.trending.rebuild')
+        tasks.run_pending()
+        self.assertEqual(trending.top(), [self.posts[0].pk])
+
+    def test_failed_delete_clears_mark(self):
+        """Откат удаления поста не оставляет пометку в потоке."""
+        self.comment(self.posts[0], 2)
+        score = cache.get(trending.KEY)['scores'][self.posts[0].pk]
+        with mock.patch('django.db.models.sql.DeleteQuery.delete_batch',
+                        side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.posts[0].delete()
+        Comment.objects.filter(post=self.posts[0]).first().delete()
+        self.assertAlmostEqual(
+            cache.get(trending.KEY)['scores'][self.posts[0].pk], score / 2,
+            places=3)
+
+    def test_rolled_back_comment_ignored(self):
+        """Откаченный комментарий не попадает в оценки."""
+        try:
+            with transaction.atomic():
+                self.comment(self.posts[0])
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(trending.top(), [])
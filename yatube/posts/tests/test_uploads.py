@@ -0,0 +1,125 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import caching
+from ..forms import PostForm
+from ..models import Post
+from ..uploads import OversizedUpload, normalize
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(size, image_format='PNG', **options):
+    content = io.BytesIO()
+    Image.new('RGB', size, (200, 40, 40)).save(
+        content, image_format, **options)
+    return content.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_QUEUE=False)
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def form(self, upload):
+        return PostForm({'text': 'Пост'}, {'image': upload})
+
+    def test_upload_streamed_to_temporary_file(self):
+        upload = SimpleUploadedFile(
+            'small.png', image_bytes((20, 10)), content_type='image/png')
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': upload})
+        self.assertIsInstance(
+            response.wsgi_request.FILES['image'], TemporaryUploadedFile)
+        self.assertTrue(Post.objects.filter(text='Пост').exists())
+
+    @override_settings(POSTS_UPLOAD_MAX_SIZE=100)
+    def test_oversized_upload_rejected(self):
+        upload = SimpleUploadedFile(
+            'big.png', image_bytes((200, 200)), content_type='image/png')
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': upload})
+        self.assertIsInstance(
+            response.wsgi_request.FILES['image'], OversizedUpload)
+        self.assertFalse(Post.objects.exists())
+        form = self.form(OversizedUpload('big.png', 101, 'image/png'))
+        self.assertTrue(form.has_error('image', 'too_large'))
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        form = self.form(SimpleUploadedFile(
+            'wide.png', image_bytes((20, 10)), content_type='image/png'))
+        self.assertTrue(form.has_error('image', 'too_many_pixels'))
+
+    def test_unsupported_format_rejected(self):
+        form = self.form(SimpleUploadedFile(
+            'image.bmp', image_bytes((20, 10), 'BMP'),
+            content_type='image/bmp'))
+        self.assertTrue(form.has_error('image', 'format'))
+
+    @override_settings(POSTS_IMAGE_MAX_SIDE=1000)
+    def test_normalize_downscales_and_strips_exif(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # повёрнуто на 90°
+        exif[0x010F] = 'Camera'
+        name = default_storage.save('posts/photo.jpg', ContentFile(
+            image_bytes((3000, 2000), 'JPEG', exif=exif.tobytes())))
+        post = Post.objects.create(author=self.user, text='Фото', image=name)
+        version = caching.version(caching.post(post.pk))
+        report = normalize(name)
+        self.assertNotEqual(caching.version(caching.post(post.pk)), version)
+        # Новый файл пишется рядом, старый удаляется после переключения.
+        self.assertNotEqual(report['name'], name)
+        self.assertFalse(default_storage.exists(name))
+        name = report['name']
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        with default_storage.open(name) as file:
+            image = Image.open(file)
+            self.assertEqual(image.size, (667, 1000))
+            self.assertFalse(image.getexif())
+        # JPEG декодирован в половинном масштабе, а не целиком.
+        self.assertEqual(report['decoded_bytes'], 1500 * 1000 * 3)
+
+    @override_settings(POSTS_IMAGE_MAX_SIDE=100)
+    def test_normalize_failure_keeps_original(self):
+        name = default_storage.save(
+            'posts/big.png', ContentFile(image_bytes((300, 200))))
+        post = Post.objects.create(author=self.user, text='Фото', image=name)
+        with mock.patch.object(default_storage, 'save',
+                               side_effect=OSError('диск заполнен')):
+            with self.assertRaises(OSError):
+                normalize(name)
+        self.assertTrue(default_storage.exists(name))
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+
+    def test_normalize_keeps_small_images(self):
+        name = default_storage.save(
+            'posts/small.png', ContentFile(image_bytes((20, 10))))
+        self.assertIsNone(normalize(name))
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from ..models import Group, Post
@@ -107,6 +108,9 @@ class PaginatorViewsTest(TestCase):
             id=f'{i}') for i in range(15))
 
     def setUp(self):
+        # bulk_create не вызывает сигналы: число постов в кэше могло
+        # остаться от предыдущих тестов.
+        cache.clear()
         self.unauthorized_client = Client()
 
     def test_paginator_on_pages(self):
@@ -0,0 +1,91 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Раньше {% thumbnail %} резал картинку при первом показе, и первый
+читатель нового поста ждал декодирования и ресайза в Pillow. Теперь
+сохранение поста с картинкой ставит в очередь core.tasks генерацию
+всех размеров из GEOMETRIES, а шаблоны через {% ready_thumbnail %}
+показывают оригинал, пока миниатюра не готова. Перед нарезкой оригинал
+уменьшается и очищается от EXIF (uploads.normalize).
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core import tasks
+
+from .uploads import normalize, purge_pages
+
+# Все размеры, которые используют шаблоны постов.
+GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра из хранилища ключей или None, без генерации."""
+        source = ImageFile(file_)
+        # Имя миниатюры считается так же, как в get_thumbnail().
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        thumbnail = ImageFile(name, default.storage)
+        cached = default.kvstore.get(thumbnail)
+        if cached is None and thumbnail.exists():
+            # Миниатюру создал другой процесс, а sorl запомнил промах
+            # в локальном кэше: сбрасываем его и читаем запись из БД.
+            default.kvstore.cache.delete(add_prefix(thumbnail.key))
+            cached = default.kvstore.get(thumbnail)
+        return cached
+
+
+backend = ReadyThumbnailBackend()
+
+
+def ready_or_original(image, geometry_string, **options):
+    if not image:
+        return None
+    return backend.get_ready_thumbnail(
+        image, geometry_string, **options) or image
+
+
+def generate(name):
+    """Создаёт миниатюры всех размеров для файла из MEDIA_ROOT."""
+    name = (normalize(name) or {}).get('name', name)
+    for geometry_string, options in GEOMETRIES:
+        get_thumbnail(name, geometry_string, **options)
+    # Страницы с оригиналом вместо миниатюры лежат во фрагментном и
+    # страничном кэше; новая версия покажет миниатюру.
+    purge_pages(name)
+    return name
+
+
+def make_pool(workers):
+    # Воркеры наследуют настроенный Django, но не соединения с БД.
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=connections.close_all,
+    )
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр в очередь или выполняет её сразу."""
+    if not settings.POSTS_THUMBNAIL_QUEUE:
+        generate(name)
+        return
+    tasks.enqueue(generate, name, key=f'thumbnail:{name}')
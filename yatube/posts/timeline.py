@@ -0,0 +1,138 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Новый пост сразу раскладывается в Timeline всех подписчиков автора, и
+страница /follow/ читается одним диапазоном по индексу (user, pub_date).
+Авторы, у которых подписчиков больше POSTS_TIMELINE_FANOUT_LIMIT, не
+раскладываются: их посты подмешиваются при чтении (fan-out-on-read).
+
+Фрагмент ленты кэшируется по версии области caching.feed(user_id),
+которую увеличивают подписка, отписка и изменения постов авторов, плюс
+по версиям профилей популярных авторов.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import caching, counters
+from .models import AuthorStats, Follow, Post, Timeline
+
+
+def _entries(user_ids, posts):
+    return [
+        Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id in user_ids
+        for post_id, pub_date in posts
+    ]
+
+
+def _insert(entries):
+    Timeline.objects.bulk_create(
+        entries,
+        batch_size=settings.POSTS_TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def is_heavy(followers):
+    return followers > settings.POSTS_TIMELINE_FANOUT_LIMIT
+
+
+def recent_posts(author_id):
+    return Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk').values_list(
+        'pk', 'pub_date')[:settings.POSTS_TIMELINE_BACKFILL]
+
+
+def followers(author_id):
+    # Ленты пишутся по Follow в той же транзакции, а не по кэшу
+    # follow_graph: его копия в другом процессе может отставать.
+    return Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_heavy(counters.get(post.author_id, 'followers')):
+        return
+    _insert(_entries(followers(post.author_id), [(post.pk, post.pub_date)]))
+
+
+def follower_feeds(author_id):
+    """Области кэша лент, в которые раскладываются посты автора.
+
+    Ленты с постами популярного автора инвалидирует версия его профиля.
+    """
+    if is_heavy(counters.get(author_id, 'followers')):
+        return []
+    return [caching.feed(user_id) for user_id in followers(author_id)]
+
+
+def follow(user_id, author_id):
+    """Добавляет в ленту читателя последние посты автора."""
+    if not is_heavy(counters.get(author_id, 'followers')):
+        _insert(_entries([user_id], recent_posts(author_id)))
+
+
+@transaction.atomic
+def unfollow(user_id, author_id):
+    """Убирает посты автора из ленты читателя."""
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+    limit = settings.POSTS_TIMELINE_FANOUT_LIMIT
+    if counters.get(author_id, 'followers') == limit:
+        # Автор снова раскладывается при записи: доносим посты,
+        # пропущенные, пока он читался через fan-out-on-read.
+        readers = list(followers(author_id))
+        _insert(_entries(readers, recent_posts(author_id)))
+        caching.bump(*map(caching.feed, readers))
+
+
+def heavy_authors(user):
+    """id популярных авторов, на которых подписан пользователь."""
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers__gt=settings.POSTS_TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+
+
+def feed_scopes(user, heavy):
+    """Области кэша, от которых зависит лента пользователя."""
+    return (caching.feed(user.pk), *map(caching.profile, heavy))
+
+
+def follow_feed(user, heavy=None):
+    """Queryset ленты подписок пользователя.
+
+    Обычно это записи Timeline; если среди авторов есть слишком
+    популярные, возвращается Post с подмешанными при чтении постами.
+    """
+    if heavy is None:
+        heavy = heavy_authors(user)
+    if not heavy:
+        return Timeline.objects.filter(user=user).select_related(
+            'post__author', 'post__group')
+    return Post.objects.filter(
+        Q(pk__in=Timeline.objects.filter(user=user).values('post'))
+        | Q(author_id__in=heavy)
+    ).select_related('author', 'group')
+
+
+def as_posts(object_list):
+    """Превращает страницу записей Timeline в список постов."""
+    return [
+        entry.post if isinstance(entry, Timeline) else entry
+        for entry in object_list
+    ]
+
+
+@transaction.atomic
+def rebuild():
+    """Пересобирает ленты с нуля по актуальным счётчикам подписчиков."""
+    counters.rebuild()
+    Timeline.objects.all().delete()
+    authors = AuthorStats.objects.filter(
+        followers__gt=0,
+        followers__lte=settings.POSTS_TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True)
+    for author_id in authors.iterator():
+        _insert(_entries(followers(author_id), recent_posts(author_id)))
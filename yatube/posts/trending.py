@@ -0,0 +1,124 @@
+"""Популярные посты по числу свежих комментариев.
+
+Вес комментария убывает вдвое за POSTS_TRENDING_HALF_LIFE секунд. Чтобы
+не пересчитывать все оценки со временем, вес хранится «в будущем»:
+комментарий в момент t добавляет 2 ** ((t - epoch) / half_life), и
+порядок оценок совпадает с порядком затухающих весов. Когда показатель
+становится слишком большим, оценки делятся на общую степень двойки, а
+epoch сдвигается.
+
+Оценки лежат одним словарём в кэше и обновляются сигналами Comment
+после коммита, чтобы откаченный комментарий не попал в рейтинг. В
+нём не больше POSTS_TRENDING_CANDIDATES постов: при переполнении
+выбрасываются посты с наименьшей оценкой, поэтому вернувшийся пост
+теряет старые комментарии. Эти потери и гонки параллельных обновлений
+исправляет команда compact_trending, которая пересчитывает оценки по
+комментариям последних WINDOW_HALF_LIVES периодов. Если оценок в кэше
+нет, страница показывает пустой список, а пересчёт ставится в очередь
+core.tasks: он читает все свежие комментарии и не должен идти в запросе.
+"""
+import heapq
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import tasks
+
+from . import caching
+from .models import Comment
+
+KEY = 'posts:trending'
+# Комментарии старше стольких периодов весят меньше 1/1024 и не
+# учитываются при пересчёте.
+WINDOW_HALF_LIVES = 10
+# Показатель степени, после которого оценки приводятся к новой epoch.
+REBASE_AFTER = 256
+
+
+def _weight(timestamp, epoch):
+    return 2 ** ((timestamp - epoch) / settings.POSTS_TRENDING_HALF_LIFE)
+
+
+def _rebase(state, now):
+    exponent = (now - state['epoch']) / settings.POSTS_TRENDING_HALF_LIFE
+    if exponent < REBASE_AFTER:
+        return
+    factor = 2 ** -exponent
+    state['scores'] = {
+        post_id: score * factor
+        for post_id, score in state['scores'].items()
+    }
+    state['epoch'] = now
+
+
+def _trim(scores):
+    limit = settings.POSTS_TRENDING_CANDIDATES
+    if len(scores) > limit:
+        keep = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        scores = dict(keep)
+    return scores
+
+
+def _save(state):
+    cache.set(KEY, state, None)
+    caching.bump(caching.TRENDING)
+
+
+def _state():
+    state = cache.get(KEY)
+    if state is None:
+        tasks.enqueue(rebuild, key=KEY)
+        state = {'epoch': time.time(), 'scores': {}}
+    return state
+
+
+def add(post_id, created, sign=1):
+    """Учитывает добавленный (sign=1) или удалённый (-1) комментарий."""
+    state = cache.get(KEY)
+    if state is None:
+        # Оценки пересчитает задача из очереди, и комментарий в них войдёт.
+        return
+    timestamp = created.timestamp()
+    _rebase(state, timestamp)
+    weight = _weight(timestamp, state['epoch'])
+    score = state['scores'].get(post_id, 0) + sign * weight
+    # Остаток после удаления последнего комментария — ошибка округления.
+    if score > weight * 1e-9:
+        state['scores'][post_id] = score
+    else:
+        state['scores'].pop(post_id, None)
+    state['scores'] = _trim(state['scores'])
+    _save(state)
+
+
+def remove(post_id):
+    """Убирает удалённый пост."""
+    state = cache.get(KEY)
+    if state is not None and state['scores'].pop(post_id, None) is not None:
+        _save(state)
+
+
+def rebuild(now=None):
+    """Пересчитывает оценки по комментариям последних периодов."""
+    now = now or time.time()
+    window = WINDOW_HALF_LIVES * settings.POSTS_TRENDING_HALF_LIFE
+    scores = {}
+    comments = Comment.objects.filter(
+        created__gte=datetime.fromtimestamp(now - window, timezone.utc),
+    ).order_by().values_list('post_id', 'created')
+    for post_id, created in comments.iterator():
+        scores[post_id] = (scores.get(post_id, 0)
+                           + _weight(created.timestamp(), now))
+    state = {'epoch': now, 'scores': _trim(scores)}
+    _save(state)
+    return state
+
+
+def top(limit=None):
+    """id самых популярных постов по убыванию оценки."""
+    scores = _state()['scores']
+    limit = limit or settings.POSTS_TRENDING_SIZE
+    return [post_id for post_id, _ in heapq.nlargest(
+        limit, scores.items(), key=lambda item: item[1])]
@@ -0,0 +1,154 @@
+"""Приём и нормализация картинок постов.
+
+Загрузка пишется во временный файл кусками (LimitedUploadHandler), так
+что память на запрос не зависит от размера файла; после
+POSTS_UPLOAD_MAX_SIZE байт запись прекращается, и форма отклоняет файл.
+BoundedImageField проверяет формат и размеры по заголовку картинки, не
+декодируя пиксели.
+
+В фоне, перед генерацией миниатюр, normalize() уменьшает оригинал до
+POSTS_IMAGE_MAX_SIDE по большей стороне и сохраняет его без EXIF
+(поворот из EXIF применяется к пикселям). JPEG декодируется сразу в
+уменьшенном масштабе (draft), поэтому 40-мегапиксельное фото не
+разворачивается в память целиком.
+"""
+import logging
+import tempfile
+
+from django import forms
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+EXIF_ORIENTATION = 0x0112
+JPEG_QUALITY = 85
+
+
+class OversizedUpload(UploadedFile):
+    """Файл, запись которого прекращена после лимита размера."""
+
+    def __init__(self, name, size, content_type):
+        super().__init__(None, name, content_type, size)
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузки на диск и не пишет больше лимита."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POSTS_UPLOAD_MAX_SIZE:
+            # Остаток тела запроса парсер дочитает и отбросит.
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.received > settings.POSTS_UPLOAD_MAX_SIZE:
+            self.file.close()
+            return OversizedUpload(
+                self.file_name, self.received, self.content_type)
+        return super().file_complete(file_size)
+
+
+class BoundedImageField(forms.ImageField):
+    default_error_messages = {
+        'too_large': 'Файл больше %(limit)s.',
+        'too_many_pixels': ('Картинка %(width)s×%(height)s больше '
+                            '%(limit)s мегапикселей.'),
+        'format': 'Поддерживаются JPEG, PNG, GIF и WebP.',
+    }
+
+    def to_python(self, data):
+        if isinstance(data, OversizedUpload):
+            raise forms.ValidationError(
+                self.error_messages['too_large'], code='too_large',
+                params={'limit': filesizeformat(
+                    settings.POSTS_UPLOAD_MAX_SIZE)})
+        # ImageField открывает файл в Pillow: читается только заголовок.
+        file = super().to_python(data)
+        if file is None:
+            return None
+        if file.image.format not in FORMATS:
+            raise forms.ValidationError(
+                self.error_messages['format'], code='format')
+        width, height = file.image.size
+        if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                self.error_messages['too_many_pixels'],
+                code='too_many_pixels',
+                params={'width': width, 'height': height,
+                        'limit': settings.POSTS_IMAGE_MAX_PIXELS // 10 ** 6})
+        return file
+
+
+def purge_pages(name):
+    """Инвалидирует кэшированные страницы постов с картинкой name.
+
+    Ленты подписчиков не трогаются: их до POSTS_TIMELINE_FANOUT_LIMIT на
+    автора, а оригинал в ленте показывается до следующего изменения.
+    """
+    scopes = {caching.INDEX}
+    for post in Post.objects.filter(image=name).only(
+            'author_id', 'group_id'):
+        scopes.update(caching.post_scopes(post))
+    caching.bump(*scopes)
+
+
+def normalize(name):
+    """Уменьшает оригинал и убирает EXIF; возвращает отчёт или None,
+    если файл менять не нужно."""
+    max_side = settings.POSTS_IMAGE_MAX_SIDE
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        source_size = image.size
+        image_format = image.format
+        exif = image.getexif()
+        if (max(source_size) <= max_side and not exif
+                or getattr(image, 'is_animated', False)):
+            return None
+        # Только для JPEG: декодирование в масштабе 1/2, 1/4 или 1/8.
+        image.draft(image.mode, (max_side, max_side))
+        decoded = image.width * image.height * len(image.getbands())
+        if exif.get(EXIF_ORIENTATION, 1) != 1:
+            image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        options = {'icc_profile': image.info.get('icc_profile')}
+        if image_format == 'JPEG':
+            options['quality'] = JPEG_QUALITY
+        with tempfile.TemporaryFile() as output:
+            # Без exif= Pillow не записывает метаданные.
+            image.save(output, image_format, **options)
+            size = output.tell()
+            # Оригинал занят, поэтому хранилище выберет новое имя. Если
+            # сохранение упадёт, посты останутся со старым файлом.
+            saved = default_storage.save(name, File(output))
+    # update() не шлёт сигналы: кэшированные страницы со ссылкой на
+    # старый файл инвалидируем сами, и только потом удаляем его.
+    Post.objects.filter(image=name).update(image=saved)
+    purge_pages(saved)
+    default_storage.delete(name)
+    report = {
+        'name': saved,
+        'source_size': source_size,
+        'size': image.size,
+        'bytes': size,
+        'decoded_bytes': decoded,
+    }
+    logger.info(
+        'Normalized %(name)s: %(source_size)s -> %(size)s, %(bytes)d bytes, '
+        'decoded %(decoded_bytes)d bytes',
+        report)
+    return report
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -9,11 +9,23 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/',
+         views.comments, name='comments'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('trending/', views.trending_index, name='trending'),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/posts/<int:post_id>/comments/',
+         api.comments, name='api_comments'),
+    path('api/v1/groups/<slug:slug>/posts/',
+         api.group_posts, name='api_group_posts'),
+    path('api/v1/profiles/<str:username>/posts/',
+         api.profile, name='api_profile'),
+    path('api/v1/export/posts/', api.export, name='api_export'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
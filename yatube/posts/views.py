@@ -1,68 +1,115 @@
+import hashlib
+
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
 from .forms import PostForm, CommentForm
-from django.core.paginator import Paginator
+from .paginators import CURSOR_PARAM, CursorPaginator, get_page
+from .search import search_page
+from . import (api, caching, conditional, counters, follow_graph, page_cache,
+               timeline, trending)
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user
+from django.utils.functional import SimpleLazyObject
 
 
 NUMBER_OF_POST = 10
+NUMBER_OF_COMMENTS = 20
 SYMBOLS_TEXT = 30
 
 
+def comments_paginator(post_id):
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        NUMBER_OF_COMMENTS, ordering=('-created', '-pk'))
+
+
+def comments_page(post_id, cursor):
+    return comments_paginator(post_id).get_page(cursor)
+
+
+def comments_cursor(request, post_id):
+    """Курсор комментариев из запроса и его часть ключа кэша.
+
+    Испорченный курсор означает первую страницу, а в ключ фрагмента
+    попадает только хеш курсора, не строка из URL.
+    """
+    cursor = request.GET.get(CURSOR_PARAM, '')
+    if not cursor or comments_paginator(post_id).decode_cursor(
+            cursor) is None:
+        return '', ''
+    return cursor, hashlib.md5(cursor.encode()).hexdigest()
+
+
+@conditional.conditional(conditional.index)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, NUMBER_OF_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_cache.tag(request, caching.INDEX)
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = get_page(
+        request, post_list, NUMBER_OF_POST, (caching.INDEX,))
     context = {
         'page_obj': page_obj,
+        'cache_version': caching.version(caching.INDEX),
+        'cache_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
     }
     template = 'posts/index.html'
     return render(request, template, context)
 
 
+@conditional.conditional(conditional.group_posts)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, NUMBER_OF_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_cache.tag(request, caching.group(group.pk))
+    posts = group.posts.select_related('author', 'group')
+    page_obj = get_page(
+        request, posts, NUMBER_OF_POST, (caching.group(group.pk),))
     context = {
         'page_obj': page_obj,
         'group': group,
         'posts': posts,
+        'cache_version': caching.version(caching.group(group.pk)),
+        'cache_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
     }
     template = 'posts/group_list.html'
     return render(request, template, context)
 
 
+@conditional.conditional(conditional.profile)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    posts_number = posts.count()
-    paginator = Paginator(posts, NUMBER_OF_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    page_cache.tag(request, caching.profile(author.pk), caching.GROUPS)
+    posts = author.posts.select_related('author', 'group')
+    posts_number = counters.posts_count(author)
+    page_obj = get_page(
+        request, posts, NUMBER_OF_POST, (caching.profile(author.pk),))
     follow = (request.user.is_authenticated and author != request.user
-              and Follow.objects.filter(
-                  author=author,
-                  user=request.user).exists())
+              and follow_graph.is_following(request.user.pk, author.pk))
     context = {
         'author': author,
         'post_num': posts_number,
         'page_obj': page_obj,
         'following': follow,
+        'cache_version': caching.version(
+            caching.profile(author.pk), caching.GROUPS),
+        'cache_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
     }
     template = 'posts/profile.html'
     return render(request, template, context)
 
 
+@conditional.conditional(conditional.post_detail)
 def post_detail(request, post_id):
-    posts = get_object_or_404(Post, pk=post_id)
+    posts = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
+    page_cache.tag(request, *caching.post_scopes(posts))
     title = posts.text[:SYMBOLS_TEXT]
-    posts_number = Post.objects.filter(author=posts.author).count()
-    comments = posts.comments.all()
+    posts_number = counters.posts_count(posts.author)
+    cursor, cursor_key = comments_cursor(request, posts.pk)
+    # Страница комментариев и их число читаются из БД только при
+    # промахе фрагментного кэша.
+    comments = SimpleLazyObject(lambda: comments_page(posts.pk, cursor))
     form = CommentForm()
     author = posts.author
     context = {
@@ -70,13 +117,45 @@ def post_detail(request, post_id):
         'post': posts,
         'title': title,
         'comments': comments,
+        'comments_cursor': cursor_key,
         'author': author,
         'form': form,
+        'cache_version': caching.version(caching.post(posts.pk)),
+        'cache_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
     }
     template = 'posts/post_detail.html'
     return render(request, template, context)
 
 
+def comments(request, post_id):
+    """Следующие страницы комментариев: HTML-фрагмент или JSON."""
+    if request.GET.get('format') == 'json':
+        return api.comments(request, post_id, key='comments')
+    get_object_or_404(Post.objects.values_list('pk', flat=True), pk=post_id)
+    cursor, cursor_key = comments_cursor(request, post_id)
+    context = {
+        'post_id': post_id,
+        'comments': SimpleLazyObject(lambda: comments_page(post_id, cursor)),
+        'comments_cursor': cursor_key,
+        'cache_version': caching.version(caching.post(post_id)),
+        'cache_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
+    }
+    template = 'posts/comments.html'
+    return render(request, template, context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = search_page(
+        query, request.GET.get(CURSOR_PARAM), NUMBER_OF_POST)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+    }
+    template = 'posts/search.html'
+    return render(request, template, context)
+
+
 @login_required
 def post_create(request):
     user = get_user(request)
@@ -131,25 +210,51 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, NUMBER_OF_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {'page_obj': page_obj}
+    heavy = timeline.heavy_authors(request.user)
+    scopes = timeline.feed_scopes(request.user, heavy)
+    post_list = timeline.follow_feed(request.user, heavy)
+    page_obj = get_page(request, post_list, NUMBER_OF_POST, scopes)
+    entries = page_obj.object_list
+    # Страница читается только если фрагмента нет в кэше.
+    page_obj.object_list = SimpleLazyObject(
+        lambda: timeline.as_posts(entries))
+    context = {
+        'page_obj': page_obj,
+        'cache_version': caching.version(*scopes),
+        'cache_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
+    }
     template = 'posts/follow.html'
     return render(request, template, context)
 
 
+def trending_index(request):
+    page_cache.tag(request, caching.TRENDING, caching.INDEX)
+    ids = trending.top()
+
+    def load_posts():
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    context = {
+        # Посты читаются только если фрагмента нет в кэше.
+        'post_list': SimpleLazyObject(load_posts),
+        'cache_version': caching.version(caching.TRENDING, caching.INDEX),
+        'cache_timeout': settings.POSTS_FRAGMENT_CACHE_TIMEOUT,
+    }
+    template = 'posts/trending.html'
+    return render(request, template, context)
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if (author != request.user
-        and not Follow.objects.filter(user=request.user,
-                                      author=author).exists()):
-        Follow.objects.create(
-            user=request.user,
-            author=author,
-        )
+    if author != request.user:
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=request.user, author=author)
+        except IntegrityError:
+            # Подписку уже создал параллельный запрос.
+            pass
     return redirect('posts:profile', username=username)
 
 
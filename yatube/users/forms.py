@@ -1,6 +1,10 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
 
+from core import tasks as queue
+
+from .tasks import send_password_reset
+
 
 User = get_user_model()
 
@@ -9,3 +13,23 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Письмо собирает и отправляет воркер очереди.
+
+    В задачу попадают только id пользователя и адрес сайта: ссылку со
+    сбросом пароля воркер строит сам, чтобы она не лежала в Task.payload.
+    """
+
+    # Контекст, который send_password_reset() вычисляет заново.
+    PRIVATE_CONTEXT = ('email', 'uid', 'user', 'token')
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        public = {key: value for key, value in context.items()
+                  if key not in self.PRIVATE_CONTEXT}
+        queue.enqueue(send_password_reset, context['user'].pk, public,
+                      subject_template_name, email_template_name,
+                      from_email, html_email_template_name)
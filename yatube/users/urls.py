@@ -1,7 +1,9 @@
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import (LoginView, LogoutView,
+                                       PasswordResetView)
 from django.urls import path
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -17,4 +19,9 @@ urlpatterns = [
         LoginView.as_view(template_name='users/login.html'),
         name='login'
     ),
+    # Тот же адрес, что у django.contrib.auth.urls: письмо уходит в очередь.
+    path(
+        'password_reset/',
+        PasswordResetView.as_view(form_class=QueuedPasswordResetForm),
+    ),
 ]
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -49,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'posts.page_cache.PageCacheMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,7 +68,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.timed.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -89,9 +93,48 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Копия основной базы для проверки чтения с реплики на одной машине:
+    # python manage.py copy_sqlite_replica и 'replica' в DATABASE_REPLICAS.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+
+# Алиасы реплик, с которых читают GET и HEAD; пустой список — всё
+# читается из основной базы.
+DATABASE_REPLICAS = []
+# 'random', 'round_robin' или путь к функции (replicas, request) -> алиас.
+DATABASE_REPLICA_SELECTOR = 'random'
+# Сколько секунд после записи клиент читает из основной базы.
+DATABASE_PRIMARY_COOKIE = 'yatube_primary'
+DATABASE_PRIMARY_STICKY_SECONDS = 10
+# Наибольшее ожидаемое отставание реплик, с. Столько секунд после
+# изменения области кэша (posts.caching) страницы, прочитанные с реплики,
+# кэшируются под временными версиями.
+DATABASE_REPLICA_MAX_LAG = 10
+
+# Очередь фоновых задач в основной базе (core.tasks, run_workers).
+TASKS_WORKERS = 2
+TASKS_POLL_INTERVAL = 1
+TASKS_MAX_ATTEMPTS = 5
+# Пауза перед повтором: TASKS_RETRY_BACKOFF * 2 ** (попытка - 1) секунд.
+TASKS_RETRY_BACKOFF = 2
+TASKS_RETRY_BACKOFF_MAX = 60 * 10
+# Задача в running дольше этого считается брошенной умершим воркером.
+TASKS_LOCK_TIMEOUT = 60 * 15
+# Выполненные задачи хранятся для статистики run_workers --stats.
+TASKS_KEEP_DONE = 60 * 60 * 24 * 7
+
+# WAL, busy_timeout и BEGIN IMMEDIATE для соединений SQLite (см.
+# core.sqlite_profile); SQLITE_PRAGMAS переопределяет значения профиля.
+SQLITE_PERFORMANCE_PROFILE = False
+SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -149,8 +192,88 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий кэш всех процессов хоста (см. core.cache_backends.sqlite).
+# Версии областей posts.caching должны видеть все воркеры: с
+# LocMemCache инвалидация доходит только до процесса, сделавшего запись,
+# а фрагменты и страницы живут часами. Для нескольких хостов нужен
+# сетевой кэш (Memcached, Redis).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(
+            tempfile.gettempdir(), 'yatube-cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
+
+# Кэш целых страниц лент и постов для запросов без cookie (см.
+# posts.page_cache); устаревшие страницы отсекаются версиями областей.
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Режим пагинации лент: 'numbered' (COUNT + OFFSET, номера страниц)
+# или 'cursor' (по ключу pub_date, id — без COUNT, глубина не важна).
+POSTS_PAGINATION = 'numbered'
+
+# Лента подписок: авторы с числом подписчиков больше лимита не
+# раскладываются по лентам при записи, а подмешиваются при чтении.
+POSTS_TIMELINE_FANOUT_LIMIT = 1000
+
+# Сколько последних постов автора попадает в ленту при подписке.
+POSTS_TIMELINE_BACKFILL = 1000
+
+POSTS_TIMELINE_BATCH_SIZE = 500
+
+# Массивы подписок и подписчиков в кэше (posts.follow_graph); устаревшие
+# отсекаются версиями, таймаут только освобождает память.
+POSTS_FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+
+# Популярные посты (posts.trending): вес комментария убывает вдвое за
+# HALF_LIFE секунд, на странице SIZE постов, в кэше — не больше
+# CANDIDATES оценок.
+POSTS_TRENDING_HALF_LIFE = 60 * 60 * 6
+POSTS_TRENDING_SIZE = 20
+POSTS_TRENDING_CANDIDATES = 500
+
+# Время жизни фрагментов лент: они инвалидируются версиями при
+# изменении данных, поэтому могут жить долго.
+POSTS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Пагинация главной ленты по оценке числа строк из статистики СУБД
+# (ANALYZE), если в таблице больше порога: точный COUNT(*) по огромной
+# таблице дорог даже раз на каждую новую запись.
+POSTS_APPROXIMATE_COUNT = False
+POSTS_APPROXIMATE_COUNT_THRESHOLD = 1000000
+
+# True — миниатюры новой картинки создаёт задача очереди core.tasks,
+# False — сам запрос, сразу после сохранения поста.
+POSTS_THUMBNAIL_QUEUE = True
+# Число процессов generate_thumbnails по умолчанию.
+POSTS_THUMBNAIL_WORKERS = 2
+
+# Загрузки пишутся во временный файл и обрываются после
+# POSTS_UPLOAD_MAX_SIZE байт (см. posts.uploads).
+FILE_UPLOAD_HANDLERS = ['posts.uploads.LimitedUploadHandler']
+POSTS_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+# Больше — отклоняется формой, не декодируя пиксели.
+POSTS_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+# До этого размера по большей стороне фоновый воркер уменьшает оригинал.
+POSTS_IMAGE_MAX_SIDE = 2048
+
+# Поиск: 'fts5', 'python' или None — FTS5, если он есть в SQLite.
+POSTS_SEARCH_BACKEND = None
+
+POSTS_SEARCH_BATCH_SIZE = 5000
+
+# Метрики /metrics: каждый процесс сбрасывает гистограммы в свой файл
+# в METRICS_DIR не чаще раза в METRICS_FLUSH_INTERVAL секунд. Каталог
+# общий для всех воркеров хоста; файлы умерших процессов сливаются в
+# archive.json.
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'yatube-metrics')
+METRICS_FLUSH_INTERVAL = 1
+# Токен сборщика: Authorization: Bearer <токен> (bearer_token в
+# Prometheus). Без токена /metrics отвечает 404.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN')